@@ -1,193 +1,163 @@
-from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-import os # to get the resume file
-import time # to sleep
+from selenium.webdriver.support import expected_conditions as EC
+
+from browser_profile import open_page
+from driver_pool import new_chrome
+from form_fill import fill_fields, fill_with_plan, text_steps
+from form_schema import applicant_values
+from throttle import CircuitOpenError, SiteUnavailable, is_transient
+from tracing import span, traced
+from waits import wait_optional
 # import get_links # No longer needed here, as server.py will handle orchestration
 
 # The JOB_APP dictionary should be replaced by parameters passed to auto_apply_to_job
 # and managed by the frontend.
 
+# everything auto_apply_to_job needs besides the job link, i.e. one applicant's profile
+PROFILE_FIELDS = (
+    'resume_path', 'cover_letter_path', 'full_name', 'email', 'phone_number',
+    'linkedin_profile', 'github_profile', 'portfolio_link', 'years_of_experience',
+    'grad_month', 'grad_year', 'college_name', 'degree', 'major', 'work_authorization',
+    'sponsorship_required', 'disability', 'veteran_status',
+)
+
+# what each step waits for before touching the page
+APPLICATION_FORM = "#application_form, #application-form, .application-form, form input[type='file']"
+LOCATION_SUGGESTIONS = ".pac-item, #location_autocomplete-items-popup li, ul.ui-autocomplete li"
+
+# the applicant's details keyed by the field names used in the fill plans (see form_schema.py)
+def profile_values(full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path):
+    return applicant_values({
+        'full_name': full_name, 'email': email, 'phone_number': phone_number,
+        'linkedin_profile': linkedin_profile, 'github_profile': github_profile, 'portfolio_link': portfolio_link,
+        'years_of_experience': years_of_experience, 'grad_month': grad_month, 'grad_year': grad_year,
+        'college_name': college_name, 'degree': degree, 'major': major,
+        'work_authorization': work_authorization, 'sponsorship_required': sponsorship_required,
+        'disability': disability, 'veteran_status': veteran_status, 'resume_path': resume_path,
+    })
+
 # Greenhouse has a different application form structure than Lever, and thus must be parsed differently
-def greenhouse(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path):
-    # Basic info
-    # Assuming full_name can be split into first and last
-    first_name = full_name.split(' ')[0] if ' ' in full_name else full_name
-    last_name = full_name.split(' ')[-1] if ' ' in full_name else ''
+@traced('greenhouse', ats='greenhouse')
+def greenhouse(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path, job_link=None):
+    values = profile_values(full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path)
 
-    try:
-        driver.find_element(By.ID, 'first_name').send_keys(first_name)
-        driver.find_element(By.ID, 'last_name').send_keys(last_name)
-        driver.find_element(By.ID, 'email').send_keys(email)
-        driver.find_element(By.ID, 'phone').send_keys(phone_number)
-    except NoSuchElementException:
-        pass # Handle cases where these fields might not exist
+    # one execute_script fills the form from the company's cached plan (the form is only read
+    # when there's no plan yet or it doesn't fit), see form_schema.py and form_fill.py
+    filled = fill_with_plan(driver, 'greenhouse', values, url=job_link)
 
-    # Location (simplified, as original had complex dropdown logic)
-    try:
-        loc = driver.find_element(By.ID, 'job_application_location')
-        # This might need more sophisticated handling depending on the exact form
-        # For now, just send keys if the field exists
-        loc.send_keys("Your Location Here") # Placeholder, ideally passed as param
-        # loc.send_keys(Keys.DOWN) # manipulate a dropdown menu
-        # loc.send_keys(Keys.DOWN)
-        # loc.send_keys(Keys.RETURN)
-        time.sleep(2)
-    except NoSuchElementException:
-        pass
+    # the location field pops up suggestions, give them a chance to settle (there may be none)
+    if 'location' in filled:
+        wait_optional(driver, 'location_autocomplete', EC.visibility_of_element_located((By.CSS_SELECTOR, LOCATION_SUGGESTIONS)))
 
     # Upload Resume
-    try:
-        # Assuming a file input element for resume upload
-        # This might need adjustment based on the actual HTML structure
-        resume_input = driver.find_element(By.CSS_SELECTOR, "input[type='file'][name='resume']")
-        resume_input.send_keys(os.path.abspath(resume_path))
-    except NoSuchElementException:
+    if 'resume' not in filled:
         # Fallback for paste option if file upload is not direct
+        # the text comes out of the PDF once per resume version, see attachments.py
+        if not values.get('resume_text'):
+            print("Could not find resume upload option, and there is no resume text to paste.")
+            return False # Indicate failure
         try:
-            driver.find_element(By.CSS_SELECTOR, "[data-source='paste']").click()
-            resume_zone = driver.find_element(By.ID, 'resume_text')
-            resume_zone.click()
-            # Read resume content and paste
-            with open(resume_path, 'r', encoding='utf-8') as f:
-                resume_content = f.read()
-                resume_zone.send_keys(resume_content)
+            with span('resume.paste', ats='greenhouse'):
+                driver.find_element(By.CSS_SELECTOR, "[data-source='paste']").click()
+                # set in one go instead of typing the whole resume key by key
+                if not fill_fields(driver, text_steps({'#resume_text': values['resume_text']})):
+                    print("Could not paste the resume text.")
+                    return False
         except NoSuchElementException:
             print("Could not find resume upload or paste option.")
             return False # Indicate failure
 
-    # Add LinkedIn
-    try:
-        driver.find_element(By.XPATH, "//label[contains(.,'LinkedIn')]/following-sibling::input").send_keys(linkedin_profile)
-    except NoSuchElementException:
-        pass
-
-    # Add graduation year, university, degree, major (simplified)
-    # These often involve selecting from dropdowns, which can be complex.
-    # For now, we'll assume direct input or skip if not found.
-    try:
-        driver.find_element(By.XPATH, f"//select/option[text()='{grad_year}']").click()
-    except NoSuchElementException:
-        pass
-    try:
-        driver.find_element(By.XPATH, f"//select/option[contains(.,'{college_name}')]").click()
-    except NoSuchElementException:
-        pass
-    try:
-        driver.find_element(By.XPATH, f"//select/option[contains(.,'{degree}')]").click()
-    except NoSuchElementException:
-        pass
-    try:
-        driver.find_element(By.XPATH, f"//select/option[contains(.,'{major}')]").click()
-    except NoSuchElementException:
-        pass
-
-    # Add website/portfolio
-    try:
-        driver.find_element(By.XPATH, "//label[contains(.,'Website')]/following-sibling::input").send_keys(portfolio_link)
-    except NoSuchElementException:
-        pass
-
-    # Add work authorization (simplified)
-    try:
-        driver.find_element(By.XPATH, f"//select/option[contains(.,'{work_authorization}')]").click()
-    except NoSuchElementException:
-        pass
-
     # Submit application
     try:
-        driver.find_element(By.ID, "submit_app").click()
+        with span('submit', ats='greenhouse'):
+            driver.find_element(By.ID, "submit_app").click()
         return True
     except NoSuchElementException:
         print("Submit button not found for Greenhouse.")
         return False
 
 # Handle a Lever form
-def lever(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path):
+@traced('lever', ats='lever')
+def lever(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path, job_link=None):
     # Navigate to the application page (already done by auto_apply_to_job)
     # driver.find_element(By.CLASS_NAME, 'template-btn-submit').click() # This might be for a "Start Application" button
+    values = profile_values(full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path)
 
-    # Basic info
-    try:
-        driver.find_element(By.NAME, 'name').send_keys(full_name)
-        driver.find_element(By.NAME, 'email').send_keys(email)
-        driver.find_element(By.NAME, 'phone').send_keys(phone_number)
-        # Assuming 'org' is not a required field or can be derived
-        # driver.find_element(By.NAME, 'org').send_keys(JOB_APP['org'])
-    except NoSuchElementException:
-        pass
+    # one execute_script fills the form from the company's cached plan (the form is only read
+    # when there's no plan yet or it doesn't fit), see form_schema.py and form_fill.py
+    filled = fill_with_plan(driver, 'lever', values, keep=lambda step: step['kind'] != 'file', url=job_link)
 
-    # Socials
-    try:
-        driver.find_element(By.NAME, 'urls[LinkedIn]').send_keys(linkedin_profile)
-    except NoSuchElementException:
-        pass
-    try:
-        driver.find_element(By.NAME, 'urls[Github]').send_keys(github_profile)
-    except NoSuchElementException:
-        try: # Try alternative name
-            driver.find_element(By.NAME, 'urls[GitHub]').send_keys(github_profile)
+    # Add university (simplified)
+    # lever uses a custom search widget here rather than a plain input, so it's not in the plan
+    if 'college_name' not in filled and college_name:
+        try:
+            driver.find_element(By.CLASS_NAME, 'application-university').click()
+            search = driver.find_element(By.XPATH, "//*[@type='search']")
+            search.send_keys(college_name)
+            search.send_keys(Keys.RETURN)
         except NoSuchElementException:
             pass
-    try:
-        driver.find_element(By.NAME, 'urls[Portfolio]').send_keys(portfolio_link)
-    except NoSuchElementException:
-        pass
-
-    # Add university (simplified)
-    try:
-        driver.find_element(By.CLASS_NAME, 'application-university').click()
-        search = driver.find_element(By.XPATH, "//*[@type='search']")
-        search.send_keys(college_name)
-        search.send_keys(Keys.RETURN)
-    except NoSuchElementException:
-        pass
-
-    # Add how you found out about the company (simplified)
-    try:
-        driver.find_element(By.CLASS_NAME, 'application-dropdown').click()
-        driver.find_element(By.XPATH, "//select/option[text()='Glassdoor']").click() # Assuming Glassdoor is an option
-    except NoSuchElementException:
-        pass
 
     # Submit resume last so it doesn't auto-fill the rest of the form
-    try:
-        driver.find_element(By.NAME, 'resume').send_keys(os.path.abspath(resume_path))
-    except NoSuchElementException:
+    filled |= fill_with_plan(driver, 'lever', values, keep=lambda step: step['kind'] == 'file', url=job_link)
+    if 'resume' not in filled:
         print("Could not find resume upload field for Lever.")
         return False # Indicate failure
 
     # Submit application
     try:
-        driver.find_element(By.CLASS_NAME, 'template-btn-submit').click()
+        with span('submit', ats='lever'):
+            driver.find_element(By.CLASS_NAME, 'template-btn-submit').click()
         return True
     except NoSuchElementException:
         print("Submit button not found for Lever.")
         return False
 
-def auto_apply_to_job(job_link, resume_path, cover_letter_path, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, driver_path='/usr/local/bin/chromedriver'):
-    driver = None # Initialize driver to None
-    try:
-        driver = webdriver.Chrome(executable_path=driver_path)
-        driver.get(job_link)
-        time.sleep(5) # wait for page to load
-
-        if 'greenhouse' in job_link:
-            result = greenhouse(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path)
-        elif 'lever' in job_link:
-            result = lever(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path)
-        else:
-            print(f"Job link not recognized as Greenhouse or Lever: {job_link}")
-            result = False # Indicate failure for unrecognized links
-
-        return "Application successful" if result else "Application failed"
-
-    except Exception as e:
-        print(f"An error occurred during application for {job_link}: {e}")
-        return f"Application failed: {e}"
-    finally:
-        if driver:
-            driver.quit() # Ensure driver is closed even if errors occur
+def auto_apply_to_job(job_link, resume_path, cover_letter_path, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, driver_path='/usr/local/bin/chromedriver', driver=None):
+    # a driver handed in (e.g. from server.py's DriverPool) belongs to the caller and is left open
+    own_driver = driver is None
+    ats = 'greenhouse' if 'greenhouse' in job_link else 'lever' if 'lever' in job_link else 'other'
+    # one span for the whole application, tagged with how it went (see tracing.py)
+    with span('apply', ats=ats, job_link=job_link) as trace:
+        try:
+            if own_driver:
+                driver = new_chrome(driver_path)
+            with span('page.load', ats=ats):
+                try:
+                    open_page(driver, job_link)
+                except Exception as e:
+                    # the site being down or throttling us isn't a failed application, callers
+                    # get SiteUnavailable so they don't count it against the job (see batch.py)
+                    if isinstance(e, CircuitOpenError) or is_transient(e):
+                        raise SiteUnavailable(f'{job_link} is unavailable right now: {e}') from e
+                    raise
+                # wait for the form itself rather than a fixed sleep; if it never shows up the
+                # handlers below report the missing fields
+                wait_optional(driver, 'application_form', EC.presence_of_element_located((By.CSS_SELECTOR, APPLICATION_FORM)))
+
+            if 'greenhouse' in job_link:
+                result = greenhouse(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path, job_link=job_link)
+            elif 'lever' in job_link:
+                result = lever(driver, full_name, email, phone_number, linkedin_profile, github_profile, portfolio_link, years_of_experience, grad_month, grad_year, college_name, degree, major, work_authorization, sponsorship_required, disability, veteran_status, resume_path, job_link=job_link)
+            else:
+                print(f"Job link not recognized as Greenhouse or Lever: {job_link}")
+                result = False # Indicate failure for unrecognized links
+
+            trace.tag(outcome='applied' if result else 'failed')
+            return "Application successful" if result else "Application failed"
+
+        except SiteUnavailable as e:
+            trace.tag(outcome='unavailable', error=str(e))
+            raise
+        except Exception as e:
+            print(f"An error occurred during application for {job_link}: {e}")
+            trace.tag(outcome='error', error=str(e))
+            return f"Application failed: {e}"
+        finally:
+            if own_driver and driver:
+                driver.quit() # Ensure driver is closed even if errors occur
 
 # The __main__ block is for direct script execution and can remain as is,
 # but it should call the refactored auto_apply_to_job with appropriate parameters.
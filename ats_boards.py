@@ -0,0 +1,130 @@
+# read open postings straight from the public Greenhouse / Lever job board APIs
+# for companies we already know, one request per company instead of a Glassdoor
+# search in the browser plus a redirect per listing
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from throttle import CircuitOpenError, throttle
+
+GREENHOUSE_API = 'https://boards-api.greenhouse.io/v1/boards'
+LEVER_API = 'https://api.lever.co/v0/postings'
+TIMEOUT = 15
+MAX_WORKERS = 8 # parallel requests, mostly used for the per-job greenhouse questions
+REMOTE = ('remote', 'remoto')
+
+# one keep-alive connection pool shared by every board request
+def new_session(pool_size=MAX_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class BoardFetcher:
+    def __init__(self, session=None, greenhouse_api=GREENHOUSE_API, lever_api=LEVER_API, timeout=TIMEOUT, max_workers=MAX_WORKERS):
+        self.session = session or new_session(max_workers)
+        self.greenhouse_api = greenhouse_api
+        self.lever_api = lever_api
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    def _get(self, url, params=None):
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def _get_json(self, url, params=None):
+        return throttle.call(url, lambda: self._get(url, params)).json()
+
+    # every posting is a dict with ats, company, id, title, location, url and questions
+    def greenhouse(self, board_token, include_questions=True):
+        data = self._get_json(f'{self.greenhouse_api}/{board_token}/jobs')
+        postings = [{
+            'ats': 'greenhouse',
+            'company': board_token,
+            'id': str(job['id']),
+            'title': job.get('title', ''),
+            'location': (job.get('location') or {}).get('name', ''),
+            # absolute_url is often the company's own careers page, which apply.py can't
+            # recognize - the boards.greenhouse.io link always hosts the form
+            'url': f'https://boards.greenhouse.io/{board_token}/jobs/{job["id"]}',
+            'questions': None,
+        } for job in data.get('jobs', [])]
+
+        # the list endpoint has no questions, they come one job at a time
+        if include_questions and postings:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(postings))) as pool:
+                questions = pool.map(lambda p: self._greenhouse_questions(board_token, p['id']), postings)
+                for posting, schema in zip(postings, questions):
+                    posting['questions'] = schema
+        return postings
+
+    def _greenhouse_questions(self, board_token, job_id):
+        try:
+            data = self._get_json(f'{self.greenhouse_api}/{board_token}/jobs/{job_id}', {'questions': 'true'})
+        except (requests.RequestException, CircuitOpenError) as e:
+            print(f'ERROR: no questions for greenhouse {board_token}/{job_id} - {e}')
+            return None
+        return [{
+            'label': question.get('label', ''),
+            'required': bool(question.get('required')),
+            'fields': [{
+                'name': field.get('name'),
+                'type': field.get('type'),
+                'options': [value.get('label') for value in field.get('values') or []],
+            } for field in question.get('fields', [])],
+        } for question in data.get('questions', [])]
+
+    # lever doesn't publish its application questions, questions stays None
+    def lever(self, company, include_questions=True):
+        data = self._get_json(f'{self.lever_api}/{company}', {'mode': 'json'})
+        return [{
+            'ats': 'lever',
+            'company': company,
+            'id': job['id'],
+            'title': job.get('text', ''),
+            'location': (job.get('categories') or {}).get('location', ''),
+            'url': job.get('applyUrl') or job['hostedUrl'],
+            'questions': None,
+        } for job in data]
+
+    # boards is {'greenhouse': [board tokens], 'lever': [company names]}
+    # a company that fails to load is printed and skipped, like a failed link in aggregate_links
+    def fetch_all(self, boards, include_questions=True):
+        fetchers = {'greenhouse': self.greenhouse, 'lever': self.lever}
+        tasks = [(fetchers[ats], company) for ats, companies in boards.items() if ats in fetchers for company in companies]
+        if not tasks:
+            return []
+
+        def run(task):
+            fetch, company = task
+            try:
+                return fetch(company, include_questions)
+            except (requests.RequestException, CircuitOpenError, ValueError, KeyError) as e:
+                print(f'ERROR: failed to load board {company} - {e}')
+                return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as pool:
+            return [posting for postings in pool.map(run, tasks) for posting in postings]
+
+# does a posting look like what the user searched for on glassdoor
+def matches(posting, job_title=None, location=None):
+    title = posting['title'].lower()
+    if job_title and not all(word in title for word in job_title.lower().split()):
+        return False
+    if location:
+        wanted = location.lower()
+        # the frontend searches for 'Remoto', boards say 'Remote'
+        if wanted in REMOTE:
+            wanted = 'remote'
+        if wanted not in posting['location'].lower():
+            return False
+    return True
+
+# the links of every matching posting on the given boards
+def get_board_links(boards, job_title=None, location=None, fetcher=None):
+    fetcher = fetcher or BoardFetcher()
+    postings = fetcher.fetch_all(boards, include_questions=False)
+    return {posting['url'] for posting in postings if matches(posting, job_title, location)}
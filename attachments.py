@@ -0,0 +1,143 @@
+# everything we need from a resume, worked out once per version of the file
+# the text is pulled out of the PDF (for the paste-in fallback, instead of reading the PDF
+# bytes as UTF-8), cleaned up, and scanned for the applicant's details; the result is
+# cached on disk by content hash and in memory by path, so in a batch each job costs an
+# os.stat instead of reading and parsing the file again
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# pypdf is only needed for PDF resumes, plain text ones work without it
+try:
+    from pypdf import PdfReader
+    # it logs every quirk of the file it works around, which isn't our problem
+    logging.getLogger('pypdf').setLevel(logging.ERROR)
+except ImportError:
+    PdfReader = None
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'attachments.sqlite3')
+TEXT_EXTENSIONS = ('.txt', '.md', '.text')
+
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+PHONE = re.compile(r'(?<![\w/])\+?\(?\d[\d ().-]{7,}\d(?![\w/])')
+
+# this environment can't read the file, nothing to do with the file itself
+class MissingParser(RuntimeError):
+    pass
+
+def extract_text(data, filename):
+    if filename.lower().endswith(TEXT_EXTENSIONS):
+        return data.decode('utf-8', errors='replace')
+    if PdfReader is None:
+        raise MissingParser('pypdf is needed to read PDF resumes (pip install pypdf)')
+    reader = PdfReader(io.BytesIO(data))
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+# ligatures and odd spaces folded, whitespace collapsed inside lines, at most one blank line
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text)
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    text = '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+# the applicant's contact details the text gives away, keyed like the profile fields (see apply.py)
+# only these: a resume is full of other people's names and websites (employers, schools,
+# projects) and there's no telling which one is the applicant's
+def field_hints(text):
+    hints = {}
+    email = EMAIL.search(text)
+    if email:
+        hints['email'] = email.group(0)
+    phone = PHONE.search(text)
+    if phone and sum(c.isdigit() for c in phone.group(0)) >= 9:
+        hints['phone_number'] = phone.group(0).strip()
+    return hints
+
+class AttachmentCache:
+    def __init__(self, path=DEFAULT_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS attachments ('
+            ' sha256 TEXT PRIMARY KEY,'
+            ' filename TEXT NOT NULL,'
+            ' text TEXT NOT NULL,'
+            ' hints TEXT NOT NULL,'
+            ' created_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+        self._by_path = {} # (path, mtime, size) -> attachment, so unchanged files aren't even read
+
+    def _row(self, digest):
+        row = self._conn.execute('SELECT filename, text, hints FROM attachments WHERE sha256 = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        return {'sha256': digest, 'filename': row[0], 'text': row[1], 'hints': json.loads(row[2])}
+
+    # {path, sha256, filename, text, hints} for the file at path, or None if there's none
+    def load(self, path):
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            attachment = self._by_path.get(key)
+            if attachment is not None:
+                return attachment
+
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            attachment = self._row(digest)
+            if attachment is None:
+                persist = True
+                try:
+                    text = normalize_text(extract_text(data, path))
+                except MissingParser as e:
+                    # only remembered until the server restarts, so installing pypdf fixes it
+                    print(f"Could not extract the text of {path}: {e}")
+                    text, persist = '', False
+                except Exception as e:
+                    # a broken file is cached too, so it isn't parsed again for every job
+                    print(f"Could not extract the text of {path}: {e}")
+                    text = ''
+                attachment = {'sha256': digest, 'filename': os.path.basename(path), 'text': text, 'hints': field_hints(text)}
+                if persist:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO attachments VALUES (?, ?, ?, ?, ?)',
+                        (digest, attachment['filename'], text, json.dumps(attachment['hints']), time.time()),
+                    )
+                    self._conn.commit()
+            attachment['path'] = path
+            self._by_path[key] = attachment
+        return attachment
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_attachments():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AttachmentCache()
+        return _default_cache
+
+# the cached attachment for path, None when the file is missing or can't be read
+def load_attachment(path):
+    try:
+        return default_attachments().load(path)
+    except OSError as e:
+        print(f"Could not read attachment {path}: {e}")
+        return None
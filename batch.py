@@ -0,0 +1,62 @@
+# run a batch of applications for one applicant on a bounded pool of worker threads
+# each worker borrows a browser from the DriverPool, so throughput scales with the
+# number of workers instead of one Selenium run after another
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from apply import PROFILE_FIELDS, auto_apply_to_job
+from attachments import load_attachment
+
+SUCCESS = "Application successful"
+
+# pick the profile fields out of a request body, missing ones become None
+def profile_from(data):
+    return {field: data.get(field) for field in PROFILE_FIELDS}
+
+# ledger (see ledger.py) is optional: jobs it has as done are skipped, outcomes are recorded in it
+def apply_one(job_link, profile, pool, ledger=None):
+    if ledger is not None and ledger.is_done(job_link):
+        return {
+            "job_link": job_link,
+            "status": "skipped",
+            "result": f"Already processed ({ledger.status(job_link)})",
+            "error": None,
+            "seconds": 0,
+        }
+
+    start = time.perf_counter()
+    try:
+        with pool.driver() as driver:
+            result = auto_apply_to_job(job_link, **profile, driver=driver)
+        error = None if result == SUCCESS else result
+        if ledger is not None:
+            ledger.record(job_link, error is None, result)
+    except Exception as e:
+        # auto_apply_to_job catches its own errors, this is the pool failing to start a browser
+        # or the site being unavailable (throttle.SiteUnavailable), not the job's fault, so it
+        # isn't recorded
+        result = f"Application failed: {e}"
+        error = str(e)
+
+    return {
+        "job_link": job_link,
+        "status": "applied" if error is None else "failed",
+        "result": result,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+# how many applications actually run at once: more workers than browsers would just
+# queue up on the pool (raise DRIVER_POOL_SIZE for more), nor more than there are jobs
+def batch_workers(job_links, pool, workers=None):
+    return max(1, min(workers or pool.size, pool.size, len(job_links)))
+
+# results come back in the same order as job_links
+def run_batch(job_links, profile, pool, workers=None, ledger=None):
+    if not job_links:
+        return []
+    # read and parse the resume once up front, every job then gets it from memory
+    load_attachment(profile.get('resume_path'))
+    workers = batch_workers(job_links, pool, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda link: apply_one(link, profile, pool, ledger), job_links))
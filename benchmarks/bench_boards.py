@@ -0,0 +1,119 @@
+# the Greenhouse / Lever board readers against recorded API answers, fully offline: a local
+# stub serves fixtures/greenhouse_jobs.json, greenhouse_job_questions.json and
+# lever_postings.json under the same paths as boards-api.greenhouse.io and api.lever.co,
+# and BoardFetcher is pointed at it
+# checks the postings, questions and search matches come out right, then times fetch_all
+# one request at a time against the default worker pool
+# usage: python benchmarks/bench_boards.py [companies_per_ats] [latency_seconds]
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ats_boards import MAX_WORKERS, BoardFetcher, get_board_links
+from throttle import throttle
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+COMPANIES = 4
+LATENCY = 0.05
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return json.load(f)
+
+GREENHOUSE_JOBS = _fixture('greenhouse_jobs.json')
+GREENHOUSE_QUESTIONS = _fixture('greenhouse_job_questions.json')
+LEVER_POSTINGS = _fixture('lever_postings.json')
+
+class BoardStub(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _json(self, data, code=200):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # /greenhouse/<token>/jobs, /greenhouse/<token>/jobs/<id>?questions=true, /lever/<company>?mode=json
+    def do_GET(self):
+        time.sleep(LATENCY)
+        with self.server.lock:
+            self.server.requests += 1
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if parts[0] == 'greenhouse' and len(parts) == 3 and parts[2] == 'jobs':
+            return self._json(GREENHOUSE_JOBS)
+        if parts[0] == 'greenhouse' and len(parts) == 4:
+            job = next((job for job in GREENHOUSE_JOBS['jobs'] if str(job['id']) == parts[3]), None)
+            if job is None:
+                return self._json({'status': 404, 'error': 'Job not found'}, 404)
+            return self._json({**GREENHOUSE_QUESTIONS, 'id': job['id'], 'title': job['title'], 'location': job['location']})
+        if parts[0] == 'lever' and len(parts) == 2:
+            company = parts[1]
+            return self._json([
+                {**posting, 'hostedUrl': posting['hostedUrl'].replace('COMPANY', company), 'applyUrl': posting['applyUrl'].replace('COMPANY', company)}
+                for posting in LEVER_POSTINGS
+            ])
+        self._json({'error': 'not found'}, 404)
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BoardStub)
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def check(postings, boards, links):
+    greenhouse = [p for p in postings if p['ats'] == 'greenhouse']
+    lever = [p for p in postings if p['ats'] == 'lever']
+    assert len(greenhouse) == len(boards['greenhouse']) * len(GREENHOUSE_JOBS['jobs']), len(greenhouse)
+    assert len(lever) == len(boards['lever']) * len(LEVER_POSTINGS), len(lever)
+    assert all(p['url'].startswith('https://boards.greenhouse.io/') for p in greenhouse)
+    assert all(p['url'].endswith('/apply') for p in lever)
+    # every greenhouse posting got the detail endpoint's questions, lever has none to give
+    assert all(p['questions'] and p['questions'][0]['fields'][0]['name'] == 'first_name' for p in greenhouse)
+    assert all(p['questions'] is None for p in lever)
+    select = next(q for q in greenhouse[0]['questions'] if q['label'].startswith('Are you legally'))
+    assert select['required'] and select['fields'][0]['options'] == ['Yes', 'No']
+
+    # 'software engineer' in 'San Francisco': 2 of the greenhouse jobs and 1 lever posting per company
+    company = boards['greenhouse'][0]
+    assert f'https://boards.greenhouse.io/{company}/jobs/4012345001' in links
+    assert f'https://boards.greenhouse.io/{company}/jobs/4012345003' not in links # product designer
+    assert len(links) == 2 * len(boards['greenhouse']) + len(boards['lever']), len(links)
+
+def timed(server, fetcher, boards):
+    server.requests = 0
+    start = time.perf_counter()
+    postings = fetcher.fetch_all(boards)
+    return postings, time.perf_counter() - start, server.requests
+
+if __name__ == '__main__':
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else COMPANIES
+    LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else LATENCY
+    # the stub is on localhost, keep the shared limiter from setting the pace
+    throttle.default_rate = (10000.0, 10000, 10000.0)
+
+    server = start_stub()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    boards = {'greenhouse': [f'acme{n}' for n in range(companies)], 'lever': [f'globex{n}' for n in range(companies)]}
+    try:
+        fetcher = BoardFetcher(greenhouse_api=f'{base}/greenhouse', lever_api=f'{base}/lever')
+        postings, seconds, requests = timed(server, fetcher, boards)
+        links = get_board_links(boards, job_title='software engineer', location='San Francisco', fetcher=fetcher)
+        check(postings, boards, links)
+        print(f'{len(postings)} postings from {2 * companies} boards, {len(links)} matching links - checks passed')
+
+        sequential = BoardFetcher(greenhouse_api=f'{base}/greenhouse', lever_api=f'{base}/lever', max_workers=1)
+        _, one_at_a_time, _ = timed(server, sequential, boards)
+        print(f'one request at a time: {one_at_a_time:.2f} s for {requests} requests ({LATENCY * 1000:.0f} ms each)')
+        print(f'{MAX_WORKERS} workers:             {seconds:.2f} s ({one_at_a_time / seconds:.1f}x)')
+    finally:
+        server.shutdown()
+        server.server_close()
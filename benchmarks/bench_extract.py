@@ -0,0 +1,66 @@
+# parse time and peak memory of pulling job links out of a results page:
+# the old full-tree BeautifulSoup(page_source).findAll vs link_extract.extract_jobs
+# the saved fixture page is padded with the kind of inline scripts / markup a real
+# glassdoor page carries so it reaches a realistic size
+# usage: python benchmarks/bench_extract.py [padding_mb] [rounds]
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+from bs4 import BeautifulSoup, GuessedAtParserWarning
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from link_extract import PARSER, extract_jobs
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'glassdoor_results.html')
+
+def padded_page(padding_mb):
+    with open(FIXTURE, encoding='utf-8') as f:
+        page = f.read()
+    block = '<div class="css-1x2y3z"><a href="/Reviews/x.htm">Reviews</a><span>Filler markup</span></div>\n'
+    script = '<script>window.__APOLLO_STATE__ = {' + '"k": "v",' * 1000 + '};</script>\n'
+    chunk = block * 50 + script
+    chunks = max(2, int(padding_mb * 1024 * 1024 / len(chunk)))
+    # filler on both sides of the job list, like the header / footer / state blobs
+    before = chunk * (chunks // 2)
+    after = chunk * (chunks - chunks // 2)
+    return page.replace('<div id="PageContent">', '<div id="PageContent">' + before).replace('</body>', after + '</body>')
+
+# what aggregate_links used to do (including not picking a parser, which bs4 warns about)
+warnings.filterwarnings('ignore', category=GuessedAtParserWarning)
+warnings.filterwarnings('ignore', category=DeprecationWarning, module=__name__) # findAll
+
+def old_extract(page_source):
+    soup = BeautifulSoup(page_source)
+    return [jobLink['href'] for jobLink in soup.findAll("a", {"class": "jobLink"})]
+
+def new_extract(page_source):
+    return [job['href'] for job in extract_jobs(page_source)]
+
+def measure(fn, page, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn(page)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    fn(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+if __name__ == '__main__':
+    padding_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    page = padded_page(padding_mb)
+
+    old, old_time, old_peak = measure(old_extract, page, rounds)
+    new, new_time, new_peak = measure(new_extract, page, rounds)
+
+    # the old approach picks up both the title and the employer link of every card
+    assert set(new) <= set(old) and len(new) == 30, 'extractors disagree'
+    print(f'page: {len(page) / 1024 / 1024:.1f} MB, {len(new)} job cards, parser: {PARSER}')
+    print(f'full tree:     {old_time * 1000:8.1f} ms, peak {old_peak / 1024 / 1024:6.1f} MB, {len(old)} hrefs')
+    print(f'extract_jobs:  {new_time * 1000:8.1f} ms, peak {new_peak / 1024 / 1024:6.1f} MB, {len(new)} hrefs')
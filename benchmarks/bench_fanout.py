@@ -0,0 +1,82 @@
+# many glassdoor searches at once through fanout.FanOut, fully offline: the home page,
+# search bar and results come from a local ReplayServer and the browsers are FakeDrivers
+# (see replay.py), so the one login, the session cookies handed to every worker, each
+# search and its pages all really happen, just against localhost
+# the same title x location searches run with one worker and with several, and checks
+# every worker searched with the login's session and every link knows which searches
+# found it: the first results page of a title is the same in every location (see replay.py),
+# so those links come from every location, the rest from exactly one search
+# usage: python benchmarks/bench_fanout.py [workers] [max_results_per_search, a multiple of 24]
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fanout
+import get_links
+from driver_pool import DriverPool
+from fanout import FanOut
+from replay import FakeDriver, ReplayServer, isolate_caches
+from tracing import tracer
+
+JOB_TITLES = ['Software Engineer', 'Data Scientist', 'Product Manager']
+LOCATIONS = ['San Francisco', 'New York']
+WORKERS = 3
+MAX_RESULTS = 72 # three results pages per search
+FIRST_PAGE = 24 # links on the first results page
+SERVER_LATENCY = 0.05 # seconds per HTTP response
+ROUND_TRIP = 0.004 # seconds per WebDriver command
+RATE = 20.0 # search starts + page downloads per second, over all workers
+
+def check(found, server, first_page):
+    everywhere = [link for link, sources in found.items() if len(sources) > 1]
+    for link, sources in found.items():
+        assert len({query['job_title'] for query in sources}) == 1, (link, sources)
+        assert len(sources) in (1, len(LOCATIONS)), (link, sources)
+    # page 1 of every title found in every location, then each search's own pages
+    assert len(everywhere) == len(JOB_TITLES) * first_page, (len(everywhere), first_page)
+    assert len(found) - len(everywhere) == len(JOB_TITLES) * len(LOCATIONS) * (MAX_RESULTS - first_page), len(found)
+    # only the login's session was used for results, by the browsers and the page downloads
+    assert server.result_sessions == {server.sessions[0]}, (server.result_sessions, server.sessions[:1])
+
+def run(server, workers):
+    isolate_caches() # nothing resolved by the previous run
+    server.sessions.clear()
+    server.result_sessions.clear()
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver(ROUND_TRIP))
+        return drivers[-1]
+
+    pool = DriverPool(factory, size=workers)
+    tracer.reset()
+    start = time.perf_counter()
+    found = FanOut(pool.driver, max_parallel=workers, rate=RATE, max_results=MAX_RESULTS).run(JOB_TITLES, LOCATIONS)
+    seconds = time.perf_counter() - start
+    pool.close()
+
+    # the login waits a second for the user, the same for any number of workers
+    searches = [span for span in tracer.spans() if span['name'] == 'fanout.search']
+    searching = max(span['start'] + span['seconds'] for span in searches) - min(span['start'] for span in searches)
+    return found, seconds, searching, sum(driver.commands for driver in drivers)
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WORKERS
+    MAX_RESULTS = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_RESULTS
+    server = ReplayServer(SERVER_LATENCY).start()
+    # login and share_session open glassdoor's home page, this one instead
+    get_links.GLASSDOOR_HOME = fanout.GLASSDOOR_HOME = server.home_url
+    queries = len(JOB_TITLES) * len(LOCATIONS)
+    try:
+        results = {}
+        for count in (1, workers):
+            found, seconds, searching, round_trips = run(server, count)
+            check(found, server, FIRST_PAGE)
+            results[count] = searching
+            everywhere = sum(1 for sources in found.values() if len(sources) > 1)
+            print(f'{count} worker(s): {queries} searches, {len(found)} links ({everywhere} found in every location) '
+                  f'in {seconds:.2f} s, {searching:.2f} s of it searching, {round_trips} round trips')
+        print(f'searching with {workers} workers: {results[1] / results[workers]:.1f}x faster than with one - checks passed')
+    finally:
+        server.stop()
@@ -0,0 +1,117 @@
+# compare filling the fixture forms the old way (one find_element + send_keys / option
+# XPath per field) against form_schema + form_fill, counting WebDriver round trips
+# needs Chrome and chromedriver, pages are served locally so it runs offline
+# usage: python benchmarks/bench_fill.py [chromedriver_path]
+import functools
+import os
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver_pool import DEFAULT_DRIVER_PATH, new_chrome
+from form_fill import fill_with_plan
+from form_schema import FillPlanCache, applicant_values
+from replay import isolate_caches
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# turned into applicant values in __main__, once the caches are in memory: the "resume" is
+# a fixture page, its (empty) text mustn't end up in the real attachments.sqlite3
+PROFILE = {
+    'full_name': 'John Doe', 'email': 'john.doe@example.com', 'phone_number': '123-456-7890',
+    'linkedin_profile': 'https://www.linkedin.com/in/johndoe', 'github_profile': 'https://github.com/johndoe',
+    'portfolio_link': 'https://www.johndoe.com', 'grad_year': '2015', 'college_name': 'University of Placeholder',
+    'degree': 'Bachelor', 'major': 'Computer Science', 'work_authorization': 'Yes', 'sponsorship_required': 'No',
+    'disability': 'No', 'veteran_status': 'No', 'resume_path': os.path.join(FIXTURES, 'greenhouse_form.html'),
+}
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_fixtures():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=FIXTURES))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# every selenium command goes through WebDriver.execute, count them
+def count_round_trips(driver):
+    counter = {'count': 0}
+    execute = driver.execute
+
+    def counted(*args, **kwargs):
+        counter['count'] += 1
+        return execute(*args, **kwargs)
+
+    driver.execute = counted
+    return counter
+
+# what greenhouse() / lever() used to do: probe field by field
+def legacy_fill(driver, fields, options):
+    for by, selector, value in fields:
+        try:
+            driver.find_element(by, selector).send_keys(value)
+        except NoSuchElementException:
+            pass
+    for value in options:
+        try:
+            driver.find_element(By.XPATH, f"//select/option[contains(.,'{value}')]").click()
+        except NoSuchElementException:
+            pass
+
+# (fields, option labels) legacy_fill goes through on each ATS's form
+def legacy_steps(values):
+    return {
+        'greenhouse': (
+            [(By.ID, 'first_name', 'John'), (By.ID, 'last_name', 'Doe'), (By.ID, 'email', values['email']),
+             (By.ID, 'phone', values['phone_number']), (By.CSS_SELECTOR, "input[type='file'][name='resume']", values['resume']),
+             (By.XPATH, "//label[contains(.,'LinkedIn')]/following-sibling::input", values['linkedin_profile']),
+             (By.XPATH, "//label[contains(.,'Website')]/following-sibling::input", values['portfolio_link'])],
+            ['2015', 'University of Placeholder', 'Bachelor', 'Computer Science', 'Yes'],
+        ),
+        'lever': (
+            [(By.NAME, 'name', 'John Doe'), (By.NAME, 'email', values['email']), (By.NAME, 'phone', values['phone_number']),
+             (By.NAME, 'urls[LinkedIn]', values['linkedin_profile']), (By.NAME, 'urls[Github]', values['github_profile']),
+             (By.NAME, 'urls[GitHub]', values['github_profile']), (By.NAME, 'urls[Portfolio]', values['portfolio_link']),
+             (By.NAME, 'resume', values['resume'])],
+            ['Glassdoor'],
+        ),
+    }
+
+def run(driver, counter, url, fill):
+    driver.get(url)
+    counter['count'] = 0
+    start = time.perf_counter()
+    fill()
+    return counter['count'], time.perf_counter() - start
+
+if __name__ == '__main__':
+    driver_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DRIVER_PATH
+    isolate_caches()
+    values = applicant_values(PROFILE)
+    legacy = legacy_steps(values)
+    server = serve_fixtures()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    driver = new_chrome(driver_path, headless=True)
+    counter = count_round_trips(driver)
+    cache = FillPlanCache(':memory:')
+
+    try:
+        for ats in ('greenhouse', 'lever'):
+            url = f'{base}/{ats}_form.html'
+            fields, options = legacy[ats]
+            old = run(driver, counter, url, lambda: legacy_fill(driver, fields, options))
+            cold = run(driver, counter, url, lambda: fill_with_plan(driver, ats, values, url=url, cache=cache))
+            warm = run(driver, counter, url, lambda: fill_with_plan(driver, ats, values, url=url, cache=cache))
+            print(f'{ats}:')
+            print(f'  per-field:          {old[0]:3d} round trips, {old[1] * 1000:7.1f} ms')
+            print(f'  batched (new plan): {cold[0]:3d} round trips, {cold[1] * 1000:7.1f} ms')
+            print(f'  batched (cached):   {warm[0]:3d} round trips, {warm[1] * 1000:7.1f} ms')
+    finally:
+        driver.quit()
+        server.shutdown()
@@ -0,0 +1,124 @@
+# end to end throughput of the scrape and apply workflows, fully offline: recorded
+# glassdoor / greenhouse / lever pages come from a local ReplayServer and the browser is a
+# FakeDriver (see replay.py), so the numbers are our own code plus modelled latencies
+# reports per-stage latency (from the tracing spans), WebDriver round trips and jobs/minute
+# exits with 1 when apply throughput falls under min_jobs_per_minute, to catch regressions
+# usage: python benchmarks/bench_pipeline.py [jobs] [min_jobs_per_minute]
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from apply import auto_apply_to_job
+from batch import SUCCESS, run_batch
+from driver_pool import DriverPool
+from get_links import aggregate_links, page_hrefs, resolve_hrefs
+from pagination import iter_pages
+from replay import FakeDriver, ReplayServer, isolate_caches
+from tracing import tracer
+
+JOBS = 40 # applications per apply run
+SERVER_LATENCY = 0.02 # seconds per HTTP response, a nearby site
+ROUND_TRIP = 0.004 # seconds per WebDriver command, roughly a local chromedriver
+WORKERS = 4 # browsers in the batch run
+
+PROFILE = {
+    'resume_path': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resume.pdf'),
+    'cover_letter_path': None, 'full_name': 'John Doe', 'email': 'john.doe@example.com',
+    'phone_number': '123-456-7890', 'linkedin_profile': 'https://www.linkedin.com/in/johndoe',
+    'github_profile': 'https://github.com/johndoe', 'portfolio_link': 'https://www.johndoe.com',
+    'years_of_experience': '5', 'grad_month': '05', 'grad_year': '2015', 'college_name': 'University of Placeholder',
+    'degree': 'Bachelor', 'major': 'Computer Science', 'work_authorization': 'Yes', 'sponsorship_required': 'No',
+    'disability': 'No', 'veteran_status': 'No',
+}
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+# per span name: count, mean / p95 ms and total seconds, slowest first
+def stage_report(spans):
+    stages = {}
+    for span in spans:
+        stages.setdefault(span['name'], []).append(span['seconds'])
+    lines = [f'  {"stage":22s} {"count":>6s} {"mean ms":>9s} {"p95 ms":>9s} {"total s":>8s}']
+    for name, seconds in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        lines.append(
+            f'  {name:22s} {len(seconds):6d} {sum(seconds) / len(seconds) * 1000:9.1f} '
+            f'{percentile(seconds, 0.95) * 1000:9.1f} {sum(seconds):8.2f}'
+        )
+    return '\n'.join(lines)
+
+def scrape(server):
+    driver = FakeDriver(ROUND_TRIP)
+    tracer.reset()
+    start = time.perf_counter()
+    driver.get(server.search_url)
+    first_page = aggregate_links(driver)
+
+    driver.get(server.search_url)
+    links = set()
+    for page, page_links in iter_pages(driver, page_hrefs(driver), resolve_hrefs):
+        links |= page_links
+    seconds = time.perf_counter() - start
+
+    print(f'scrape: {len(first_page)} links on page 1, {len(links)} over every page in {seconds:.2f} s, '
+          f'{driver.commands} round trips, {len(links) / seconds * 60:.0f} links/min')
+    print(stage_report(tracer.spans()))
+    return sorted(links)
+
+def apply_sequential(links):
+    driver = FakeDriver(ROUND_TRIP)
+    tracer.reset()
+    start = time.perf_counter()
+    results = [auto_apply_to_job(link, **PROFILE, driver=driver) for link in links]
+    seconds = time.perf_counter() - start
+
+    applied = results.count(SUCCESS)
+    print(f'apply (one browser): {applied}/{len(links)} applied in {seconds:.2f} s, '
+          f'{driver.commands / len(links):.1f} round trips per job, {len(links) / seconds * 60:.0f} jobs/min')
+    print(stage_report(tracer.spans()))
+    return len(links) / seconds * 60
+
+def apply_batch(links):
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver(ROUND_TRIP))
+        return drivers[-1]
+
+    pool = DriverPool(factory, size=WORKERS)
+    pool.warm()
+    start = time.perf_counter()
+    results = run_batch(links, PROFILE, pool, WORKERS)
+    seconds = time.perf_counter() - start
+    pool.close()
+
+    applied = sum(1 for result in results if result['status'] == 'applied')
+    round_trips = sum(driver.commands for driver in drivers)
+    print(f'apply (batch of {WORKERS}): {applied}/{len(links)} applied in {seconds:.2f} s, '
+          f'{round_trips / len(links):.1f} round trips per job (incl. pool resets), {len(links) / seconds * 60:.0f} jobs/min')
+    return len(links) / seconds * 60
+
+if __name__ == '__main__':
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else JOBS
+    min_jobs_per_minute = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    isolate_caches()
+    server = ReplayServer(SERVER_LATENCY).start()
+    try:
+        links = scrape(server)
+        print()
+        # alternate greenhouse and lever so both handlers (and their cached plans) get exercised
+        greenhouse = [link for link in links if 'greenhouse' in link]
+        lever = [link for link in links if 'lever' in link]
+        links = [link for pair in zip(greenhouse, lever) for link in pair]
+        links = (links * (jobs // len(links) + 1))[:jobs]
+        jobs_per_minute = apply_sequential(links)
+        print()
+        apply_batch(links)
+    finally:
+        server.stop()
+
+    if min_jobs_per_minute is not None and jobs_per_minute < min_jobs_per_minute:
+        print(f'\nFAIL: {jobs_per_minute:.0f} jobs/min is under {min_jobs_per_minute:.0f}')
+        sys.exit(1)
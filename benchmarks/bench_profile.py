@@ -0,0 +1,120 @@
+# compare page loads of a stock Chrome against the browser profiles in browser_profile.py
+# on a local job page full of images, web fonts, video and tracker scripts: seconds until
+# the application form is usable, and requests / bytes the browser downloaded per job
+# needs Chrome and chromedriver, pages are served locally so it runs offline
+# usage: python benchmarks/bench_profile.py [chromedriver_path] [loads]
+import mimetypes
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from apply import APPLICATION_FORM
+from browser_profile import BrowserProfile, open_page
+from driver_pool import DEFAULT_DRIVER_PATH, new_chrome
+from waits import wait_for
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+LOADS = 5
+SLOW_ASSET = 0.02 # seconds before each asset starts, roughly a CDN round trip
+SETTLE = 1.0 # after the form shows up, time for whatever is still downloading to finish
+
+PROFILES = [
+    ('stock chrome', BrowserProfile(headless=True, page_load_strategy='normal', block=(), block_trackers=False, allow={})),
+    ('eager', BrowserProfile(headless=True, page_load_strategy='eager', block=(), block_trackers=False, allow={})),
+    ('eager + blocking', BrowserProfile(headless=True, allow={})),
+    ('allowlisted images', BrowserProfile(headless=True, allow={'127.0.0.1': ('image',)})),
+]
+
+class Traffic:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+
+    def reset(self):
+        self.requests = 0
+        self.bytes = 0
+
+traffic = Traffic()
+
+# the fixture pages, plus made up assets of ?kb=N kilobytes for anything else
+# the tracker scripts are served from paths like /www.google-analytics.com/analytics.js,
+# which the tracker patterns match just like the real hosts
+class AssetHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        fixture = os.path.join(FIXTURES, os.path.basename(url.path))
+        if url.path.endswith('.html') and os.path.isfile(fixture):
+            with open(fixture, 'rb') as f:
+                body = f.read()
+            content_type = 'text/html'
+        else:
+            time.sleep(SLOW_ASSET)
+            kb = int(parse_qs(url.query).get('kb', ['1'])[0])
+            body = b'\0' * (kb * 1024)
+            if url.path.endswith('.js'):
+                body = b'/*' + b' ' * (kb * 1024) + b'*/'
+            content_type = mimetypes.guess_type(url.path)[0] or 'application/octet-stream'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # the browser moved on (or blocked the rest of it)
+        traffic.add(len(body))
+
+    def log_message(self, *args):
+        pass
+
+def serve():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), AssetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# seconds until the form can be filled, averaged over loads
+def measure(driver, url, loads):
+    total = 0.0
+    for _ in range(loads):
+        driver.get('about:blank')
+        start = time.perf_counter()
+        open_page(driver, url)
+        wait_for(driver, 'application_form', EC.presence_of_element_located((By.CSS_SELECTOR, APPLICATION_FORM)))
+        total += time.perf_counter() - start
+        # not timed, but what keeps loading in the background still counts towards the bytes
+        time.sleep(SETTLE)
+    return total / loads
+
+if __name__ == '__main__':
+    driver_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DRIVER_PATH
+    loads = int(sys.argv[2]) if len(sys.argv) > 2 else LOADS
+    server = serve()
+    url = f'http://127.0.0.1:{server.server_address[1]}/heavy_job.html'
+
+    for name, profile in PROFILES:
+        driver = new_chrome(driver_path, profile=profile)
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+            measure(driver, url, 1) # warm up chrome itself
+            traffic.reset()
+            seconds = measure(driver, url, loads)
+            print(f'{name:20s} {seconds * 1000:7.1f} ms to form, '
+                  f'{traffic.requests / loads:5.1f} requests, {traffic.bytes / loads / 1024:8.1f} KB per job')
+        finally:
+            driver.quit()
+    server.shutdown()
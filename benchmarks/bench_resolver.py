@@ -0,0 +1,96 @@
+# compare the old one-at-a-time urlopen loop against link_resolver on a local stub
+# that issues Glassdoor-style redirects with artificial latency
+# usage: python benchmarks/bench_resolver.py [num_links] [latency_seconds]
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from link_resolver import USER_AGENT, is_external, resolve_links
+from resolve_cache import ResolveCache
+
+LATENCY = 0.2
+
+class RedirectStub(BaseHTTPRequestHandler):
+    # /partner/jobListing.htm?jobListingId=N -> /job/N (every 5th one stays "on glassdoor")
+    def _respond(self, with_body):
+        if self.path.startswith('/partner/'):
+            time.sleep(LATENCY)
+            listing_id = int(self.path.rsplit('=', 1)[-1])
+            target = f'/glassdoor/easy-apply/{listing_id}' if listing_id % 5 == 0 else f'/job/{listing_id}'
+            self.send_response(302)
+            self.send_header('Location', target)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = b'<html><body>' + b'x' * 50000 + b'</body></html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RedirectStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# the loop aggregate_links used to run
+def sequential(links):
+    found = []
+    for link in links:
+        request = urllib.request.Request(link, None, {'User-Agent': USER_AGENT})
+        try:
+            newLink = urllib.request.urlopen(request).geturl()
+            if is_external(newLink):
+                found.append(newLink)
+        except Exception as e:
+            print(f'ERROR: failed for {link} - {e}')
+    return set(found)
+
+if __name__ == '__main__':
+    num_links = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else LATENCY
+
+    server = start_stub()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    links = [f'{base}/partner/jobListing.htm?jobListingId={i}' for i in range(1, num_links + 1)]
+
+    start = time.perf_counter()
+    old = sequential(links)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = resolve_links(links)
+    new_time = time.perf_counter() - start
+
+    # same links twice through an on-disk cache: the second run shouldn't hit the stub at all
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResolveCache(os.path.join(tmp, 'cache.sqlite3'))
+        resolve_links(links, cache=cache)
+        start = time.perf_counter()
+        cached = resolve_links(links, cache=cache)
+        cached_time = time.perf_counter() - start
+        cache.close()
+
+    server.shutdown()
+    assert old == new == cached, 'resolvers disagree'
+    print(f'{num_links} links, {LATENCY * 1000:.0f} ms latency, {len(new)} external')
+    print(f'sequential: {old_time:.2f}s')
+    print(f'concurrent: {new_time:.2f}s ({old_time / new_time:.1f}x)')
+    print(f'warm cache: {cached_time:.3f}s')
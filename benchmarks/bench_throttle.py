@@ -0,0 +1,137 @@
+# how the per-host limiter behaves against a site that rate limits us, fully offline:
+# a local stub answers listing redirects like glassdoor's but returns 429 (with Retry-After)
+# once more than LIMIT requests per second come in, and 503s for every request on /down/
+# the same batch of links is resolved with nothing in the way, and through a Throttle set
+# too fast on purpose so it has to find the site's pace from the 429s; then a dead site
+# shows the circuit breaker turning requests away instead of retrying every one of them, and
+# a site that answers the breaker's probe with a 429 (/busy/) doesn't leave it stuck half open
+# usage: python benchmarks/bench_throttle.py [links]
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from link_resolver import MAX_WORKERS, resolve_link
+from throttle import CircuitOpenError, Throttle
+
+LINKS = 60
+LIMIT = 10 # requests per second the stub lets through
+STARTING_RATE = 40.0 # what the throttle is told the site takes, 4x too fast
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _answer(self):
+        server = self.server
+        if self.path.startswith(('/down/', '/busy/')):
+            self.send_response(503 if self.path.startswith('/down/') else 429)
+            self.end_headers()
+            return
+        with server.lock:
+            second = int(time.monotonic())
+            if second != server.second:
+                server.second, server.count = second, 0
+            server.count += 1
+            over = server.count > LIMIT
+        if over:
+            server.refused += 1
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.end_headers()
+        elif self.path.startswith('/listing/'):
+            self.send_response(302)
+            self.send_header('Location', '/job/' + self.path.rsplit('/', 1)[-1])
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    do_GET = do_HEAD = _answer
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.second, server.count, server.refused = 0, 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def resolve_batch(links, fetch):
+    def one(link):
+        try:
+            return fetch(link)
+        except Exception:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        resolved = list(pool.map(one, links))
+    return sum(1 for url in resolved if url), time.perf_counter() - start
+
+def run(name, server, links, fetch):
+    server.refused = 0
+    ok, seconds = resolve_batch(links, fetch)
+    print(f'{name}: {ok}/{len(links)} resolved in {seconds:.2f} s, the site answered {server.refused} with 429')
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else LINKS
+    server = start_stub()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    links = [f'{base}/listing/{n}' for n in range(count)]
+    try:
+        run('no throttle', server, links, resolve_link)
+        time.sleep(1) # a fresh second on the stub
+
+        throttle = Throttle(host_rates={'127.0.0.1': (STARTING_RATE, 4)}, retries=5, backoff_base=0.2)
+        run('throttled', server, links, lambda link: throttle.call(link, lambda: resolve_link(link)))
+        host = throttle.summary()['hosts']['127.0.0.1']
+        print(f'  rate settled at {host["rate"]:.1f} req/s, {host.get("throttled", 0)} throttled, '
+              f'{host.get("retries", 0)} retries, {host.get("wait_seconds", 0):.1f} s waited for the limiter')
+
+        print()
+        throttle = Throttle(retries=2, backoff_base=0.05, breaker_failures=5, breaker_cooldown=60)
+        down = [f'{base}/down/{n}' for n in range(count)]
+        rejected = 0
+        start = time.perf_counter()
+        for link in down:
+            try:
+                throttle.call(link, lambda: resolve_link(link))
+            except CircuitOpenError:
+                rejected += 1
+            except Exception:
+                pass
+        host = throttle.summary()['hosts']['127.0.0.1']
+        print(f'dead site: {host["requests"]} requests sent, {rejected}/{count} links turned away by the open circuit '
+              f'in {time.perf_counter() - start:.2f} s')
+
+        # the probe after the cooldown is throttled: the circuit opens again for another
+        # cooldown, then lets the next probe through and closes when the site answers
+        cooldown = 0.2
+        probing = Throttle(retries=0, backoff_base=0.01, breaker_failures=5, breaker_cooldown=cooldown)
+        breaker = probing.breaker('127.0.0.1')
+        for n in range(5):
+            try:
+                probing.call(f'{base}/down/{n}', lambda: resolve_link(f'{base}/down/{n}'))
+            except Exception:
+                pass
+        assert breaker.state == breaker.OPEN, breaker.state
+        time.sleep(cooldown)
+        try:
+            probing.call(f'{base}/busy/0', lambda: resolve_link(f'{base}/busy/0'))
+        except Exception:
+            pass
+        assert breaker.state == breaker.OPEN, breaker.state
+        time.sleep(cooldown)
+        assert probing.call(f'{base}/job/0', lambda: resolve_link(f'{base}/job/0'))
+        assert breaker.state == breaker.CLOSED, breaker.state
+        print('throttled probe: circuit reopened, then closed again on the next probe')
+
+        print()
+        print(throttle.metrics())
+    finally:
+        server.shutdown()
+        server.server_close()
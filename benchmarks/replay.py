@@ -0,0 +1,470 @@
+# offline stand-ins for glassdoor, the ATS sites and Chrome, for the benchmarks
+# ReplayServer serves the recorded pages in fixtures/ from localhost: the glassdoor home
+# page and its search bar (which hands out a session cookie and redirects each search to its
+# own SRCH url), results pages (every _IP<n> page of every search gets its own listing ids,
+# except that the first page of a job title is the same in every location, like the remote
+# and promoted postings glassdoor shows everywhere), the partner redirect chains behind each job link, and the greenhouse / lever
+# application forms they end up on
+# FakeDriver answers the WebDriver calls the scraper and the applier make from the html it
+# downloaded, without a browser, and counts every call as one round trip
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlencode, urljoin, urlparse
+
+import lxml.html
+import soupsieve
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import attachments
+import form_schema
+import resolve_cache
+from attachments import AttachmentCache
+from form_fill import FILL_SCRIPT, PLAN_FILL_SCRIPT
+from form_schema import FillPlanCache, field_signature
+from link_extract import EXTRACT_SCRIPT as JOBS_SCRIPT
+from link_extract import PARSER, extract_jobs
+from throttle import throttle
+from link_resolver import USER_AGENT
+from pagination import COUNT_SCRIPT, NEXT_PAGE_SCRIPT
+from resolve_cache import ResolveCache
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SEARCH_PATH = '/Job/san-francisco-software-engineer-jobs-SRCH_IL.0,13_IC1147401_KE14,31' # the one in the fixture's pager
+HOME_PATH = '/index.htm'
+RESULTS_PATH = re.compile(r'^(?P<base>/Job/[^/]*-SRCH_[^/]*?)(?:_IP(?P<page>\d+))?\.htm$')
+LISTINGS_PER_PAGE = 1000 # listing ids of page n start at 1008000000 + (n - 1) * 1000
+LISTINGS_PER_LOCATION = 100 * LISTINGS_PER_PAGE # ... plus this much per location searched in
+LISTINGS_PER_TITLE = 100 * LISTINGS_PER_LOCATION # ... plus this much per job title searched for
+SESSION_COOKIE = 'GSESSIONID'
+BLANK = '<html><head></head><body></body></html>'
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+# where a listing's redirect chain ends: every 5th is glassdoor easy apply, then
+# greenhouse and lever take turns
+def destination(listing_id):
+    if listing_id % 5 == 0:
+        return f'/glassdoor/easy-apply/{listing_id}'
+    company = f'acme{listing_id % 7}'
+    if listing_id % 2 == 0:
+        return f'/boards.greenhouse.io/{company}/jobs/{listing_id}'
+    return f'/jobs.lever.co/{company}/{listing_id:08x}-0000-4000-8000-{listing_id:012x}'
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    latency = 0.0 # seconds added to every response, set by ReplayServer
+
+    def _send(self, code, body=b'', headers=(), with_body=True):
+        self.send_response(code)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def _page(self, html, with_body):
+        self._send(200, html.encode('utf-8'), [('Content-Type', 'text/html; charset=utf-8')], with_body)
+
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+
+    def _home(self, with_body):
+        headers = [('Content-Type', 'text/html; charset=utf-8')]
+        if self._session() is None:
+            session = uuid.uuid4().hex
+            self.server.sessions.append(session)
+            headers.append(('Set-Cookie', f'{SESSION_COOKIE}={session}; Path=/'))
+        self._send(200, self.server.home_page.encode('utf-8'), headers, with_body)
+
+    # the search bar's form: every search gets its own SRCH url
+    def _search(self, query, with_body):
+        title = query.get('sc.keyword', [''])[0]
+        location = query.get('sc.location', [''])[0]
+        slug = lambda text: re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+        base = f'/Job/{slug(location)}-{slug(title)}-jobs-SRCH_IL.0,{len(location)}_KO{len(location) + 1},{len(location) + 1 + len(title)}'
+        with self.server.lock:
+            self.server.searches[base] = (
+                self.server.titles.setdefault(title.lower(), len(self.server.titles) + 1),
+                self.server.locations.setdefault(location.lower(), len(self.server.locations) + 1),
+            )
+        self._send(302, headers=[('Location', f'{base}.htm')], with_body=with_body)
+
+    def _results(self, base_path, page, with_body):
+        with self.server.lock:
+            self.server.result_sessions.add(self._session())
+        base = f'http://{self.headers["Host"]}'
+        title, location = self.server.searches.get(base_path, (0, 0))
+        offset = title * LISTINGS_PER_TITLE
+        if page > 1:
+            offset += location * LISTINGS_PER_LOCATION + (page - 1) * LISTINGS_PER_PAGE
+        html = self.server.results_page
+        html = re.sub(r'jobListingId=(\d+)', lambda m: f'jobListingId={int(m.group(1)) + offset}', html)
+        # absolute links, so the resolver follows them to this server instead of glassdoor.com
+        html = html.replace('href="/partner/', f'href="{base}/partner/')
+        # the pager links to this search's pages
+        html = html.replace(SEARCH_PATH, base_path)
+        self._page(html, with_body)
+
+    def _respond(self, with_body):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        path = url.path
+        if path == HOME_PATH:
+            return self._home(with_body)
+        if path == '/Job/jobs.htm':
+            return self._search(parse_qs(url.query), with_body)
+        results = RESULTS_PATH.match(path)
+        if results:
+            return self._results(results.group('base'), int(results.group('page') or 1), with_body)
+        if path == '/partner/jobListing.htm':
+            listing_id = parse_qs(url.query)['jobListingId'][0]
+            return self._send(302, headers=[('Location', f'/glassdoor/redirect?jobListingId={listing_id}')], with_body=with_body)
+        if path == '/glassdoor/redirect':
+            listing_id = int(parse_qs(url.query)['jobListingId'][0])
+            return self._send(302, headers=[('Location', destination(listing_id))], with_body=with_body)
+        if path.startswith('/glassdoor/easy-apply/'):
+            return self._page(BLANK, with_body)
+        if path.startswith('/boards.greenhouse.io/'):
+            return self._page(self.server.greenhouse_form, with_body)
+        if path.startswith('/jobs.lever.co/'):
+            return self._page(self.server.lever_form, with_body)
+        self._send(404, b'not recorded', with_body=with_body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, *args):
+        pass
+
+class ReplayServer(ThreadingHTTPServer):
+    def __init__(self, latency=0.0):
+        super().__init__(('127.0.0.1', 0), type('Handler', (ReplayHandler,), {'latency': latency}))
+        self.home_page = _fixture('glassdoor_home.html')
+        self.results_page = _fixture('glassdoor_results.html')
+        self.lock = threading.Lock()
+        self.titles = {} # job title searched for -> its number, which sets its listing ids
+        self.locations = {} # same for the locations
+        self.searches = {} # SRCH path -> (title number, location number)
+        self.sessions = [] # session cookies handed out by the home page, in order
+        self.result_sessions = set() # the session cookies results pages were asked for with
+        self.greenhouse_form = _fixture('greenhouse_form.html')
+        self.lever_form = _fixture('lever_form.html')
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    @property
+    def home_url(self):
+        return f'{self.base_url}{HOME_PATH}'
+
+    @property
+    def search_url(self):
+        return f'{self.base_url}{SEARCH_PATH}.htm'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+# point the resolver, fill plan and attachment caches at throwaway in-memory ones, so a
+# benchmark neither reads nor pollutes the real caches next to the code
+def isolate_caches():
+    resolve_cache._default_cache = ResolveCache(':memory:')
+    form_schema._default_cache = FillPlanCache(':memory:')
+    attachments._default_cache = AttachmentCache(':memory:')
+    # the replay server is local, don't pace it like the real sites
+    throttle.default_rate = (10000.0, 10000, 10000.0)
+
+class _Node:
+    # the bits of an element the applier looks at, from either a bs4 or an lxml node
+    # (source, kept to find the form a button submits)
+    def __init__(self, attrs, text, source=None):
+        self.attrs = attrs
+        self.text = text
+        self.source = source
+
+    # {action, inputs: [(name, id, value)]} of the GET form a button / input submits, or None
+    # (POSTs, i.e. submitting an application, aren't replayed)
+    def form(self):
+        if isinstance(self.source, lxml.html.HtmlElement):
+            tag, form = self.source.tag, next(self.source.iterancestors('form'), None)
+            inputs = form.iter('input') if form is not None else ()
+        else:
+            tag, form = self.source.name, self.source.find_parent('form')
+            inputs = form.find_all('input') if form is not None else ()
+        if tag not in ('button', 'input') or form is None or (form.get('method') or 'get').lower() != 'get':
+            return None
+        return {'action': form.get('action') or '', 'inputs': [(i.get('name'), i.get('id'), i.get('value', '')) for i in inputs]}
+
+class FakeElement:
+    def __init__(self, driver, node, selector):
+        self._driver = driver
+        self._node = node
+        self.selector = selector
+
+    @property
+    def text(self):
+        return self._node.text
+
+    def get_attribute(self, name):
+        if name == 'value' and self.selector in self._driver.values:
+            return self._driver.values[self.selector]
+        return self._node.attrs.get(name)
+
+    def is_displayed(self):
+        self._driver._command()
+        return 'display:none' not in (self._node.attrs.get('style') or '').replace(' ', '')
+
+    def is_enabled(self):
+        return 'disabled' not in self._node.attrs
+
+    def click(self):
+        self._driver._command()
+        self._driver.clicks.append(self.selector)
+        form = self._node.form() if self._node.attrs.get('type', 'submit') == 'submit' else None
+        if form is not None:
+            self._driver._submit(form)
+
+    # what a form sends for this input: by name, or id when it was looked up by id
+    def _keys(self):
+        return [key for key in (self._node.attrs.get('name'), self._node.attrs.get('id')) if key]
+
+    def clear(self):
+        self._driver._command()
+        self._driver.values.pop(self.selector, None)
+        for key in self._keys():
+            self._driver.typed.pop(key, None)
+
+    def send_keys(self, *values):
+        self._driver._command()
+        typed = ''.join(str(value) for value in values if len(str(value)) != 1 or str(value).isprintable())
+        self._driver.values[self.selector] = self._driver.values.get(self.selector, '') + typed
+        for key in self._keys():
+            self._driver.typed[key] = self._driver.typed.get(key, '') + typed
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        self._driver._command()
+
+# a WebDriver without a browser: pages are downloaded with urllib and queried with
+# beautifulsoup (css) / lxml (xpath), scripts are the python versions of the ones we inject
+# latency is the time each command takes, 0 for pure logic runs, a few ms to model chromedriver
+class FakeDriver:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.commands = 0 # round trips made so far
+        self.values = {} # selector -> value typed / set into it
+        self.typed = {} # input name / id -> value typed into it, for submitting forms
+        self.clicks = [] # selectors clicked, in order
+        self.cookies = {} # name -> cookie, as get_cookies returns them
+        self.switch_to = _SwitchTo(self)
+        self.window_handles = ['main']
+        self._url = 'about:blank'
+        self._load(BLANK)
+
+    def _command(self):
+        self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _load(self, html):
+        self.page_source = html
+        self._soup = BeautifulSoup(html, PARSER)
+        self._tree = lxml.html.fromstring(html)
+        self.values = {}
+        self.typed = {}
+        self.clicks = []
+
+    @property
+    def current_url(self):
+        self._command()
+        return self._url
+
+    def get(self, url):
+        self._command()
+        self._navigate(url)
+
+    def _navigate(self, url):
+        if not url.startswith('http'):
+            self._url = url
+            return self._load(BLANK)
+        headers = {'User-Agent': USER_AGENT}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{c['name']}={c['value']}" for c in self.cookies.values())
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=10) as response:
+            self._url = response.geturl()
+            for header in response.headers.get_all('Set-Cookie') or []:
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = {'name': name, 'value': morsel.value, 'domain': urlparse(self._url).hostname, 'path': morsel['path'] or '/'}
+            self._load(response.read().decode('utf-8'))
+
+    # a GET form being submitted, the browser navigates as part of the click
+    def _submit(self, form):
+        fields = [(name, self.typed.get(name, self.typed.get(id_, value))) for name, id_, value in form['inputs'] if name]
+        self._navigate(urljoin(self._url, form['action']) + '?' + urlencode(fields))
+
+    def _css(self, selector):
+        return [
+            FakeElement(self, _Node(dict(tag.attrs), tag.get_text(' ', strip=True), tag), selector)
+            for tag in self._soup.select(selector)
+        ]
+
+    def _xpath(self, expression):
+        return [
+            FakeElement(self, _Node(dict(node.attrib), node.text_content().strip(), node), expression)
+            for node in self._tree.xpath(expression)
+        ]
+
+    def find_elements(self, by=By.ID, value=None):
+        self._command()
+        if by == By.XPATH:
+            return self._xpath(value)
+        selector = {
+            By.ID: lambda v: '#' + soupsieve.escape(v),
+            By.NAME: lambda v: f'[name="{v}"]',
+            By.CLASS_NAME: lambda v: '.' + soupsieve.escape(v),
+            By.TAG_NAME: lambda v: v,
+            By.CSS_SELECTOR: lambda v: v,
+        }[by](value)
+        return self._css(selector)
+
+    def find_element(self, by=By.ID, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f'no element for {by}={value}')
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        self._command()
+        if script == JOBS_SCRIPT:
+            return extract_jobs(self.page_source)
+        if script == form_schema.EXTRACT_SCRIPT:
+            return {'url': self._url, 'fields': form_fields(self._soup)}
+        if script == FILL_SCRIPT:
+            return self._fill(args[0])
+        if script == PLAN_FILL_SCRIPT:
+            fields = form_fields(self._soup)
+            known = set(args[1])
+            if any(field['sig'] not in known for field in fields):
+                return {'url': self._url, 'fields': fields}
+            present = {field['sig'] for field in fields}
+            return {'rejected': self._fill([step for step in args[0] if step['sig'] in present]), 'present': list(present)}
+        if script == NEXT_PAGE_SCRIPT:
+            return [urljoin(self._url, a['href']) for a in self._soup.select("#FooterPageNav a[href], a[data-test='pagination-next']")]
+        if script == COUNT_SCRIPT:
+            el = self._soup.select_one("[data-test='jobCount'], [data-test='search-title'], #MainColSummary, .jobsCount")
+            return el.get_text(' ', strip=True) if el else None
+        if 'navigator.userAgent' in script:
+            return USER_AGENT
+        return None # storage clearing and the like, nothing to do without a browser
+
+    # python version of form_fill.FILL_JS's fillSteps
+    def _fill(self, steps):
+        rejected = []
+        for step in steps:
+            selector = step['selector'] + (f'[value="{step["value"]}"]' if step['kind'] == 'radio' else '')
+            if self._soup.select_one(selector) is None:
+                rejected.append(step['selector'])
+            else:
+                self.values[step['selector']] = step['value']
+        return rejected
+
+    def execute_cdp_cmd(self, cmd, params):
+        self._command()
+        if cmd == 'Network.clearBrowserCookies':
+            self.cookies.clear()
+        return {}
+
+    def get_cookies(self):
+        self._command()
+        return [dict(cookie) for cookie in self.cookies.values()]
+
+    def add_cookie(self, cookie):
+        self._command()
+        self.cookies[cookie['name']] = {**cookie, 'path': cookie.get('path', '/')}
+
+    def delete_all_cookies(self):
+        self._command()
+        self.cookies.clear()
+
+    def close(self):
+        self._command()
+
+    def quit(self):
+        self._command()
+
+# python version of form_schema.FORM_FIELDS_JS
+def _label(soup, el):
+    if el.get('id'):
+        label = soup.select_one(f'label[for="{el["id"]}"]')
+        if label:
+            return label.get_text(' ', strip=True)
+    wrapper = el.find_parent('label')
+    if wrapper:
+        return wrapper.get_text(' ', strip=True)
+    for prev in el.find_previous_siblings():
+        if prev.name == 'label':
+            return prev.get_text(' ', strip=True)
+    field = el.find_parent(lambda tag: tag.name in ('fieldset', 'li') or 'field' in tag.get('class', []) or 'application-question' in tag.get('class', []))
+    if field:
+        label = field.select_one('legend, label, .application-label')
+        if label:
+            return label.get_text(' ', strip=True)
+    return el.get('aria-label') or el.get('placeholder') or ''
+
+def form_fields(soup):
+    skip = ('hidden', 'submit', 'button', 'reset', 'image')
+    fields = []
+    radios = {}
+    for el in soup.select('input, select, textarea'):
+        kind = (el.get('type') or 'text').lower() if el.name == 'input' else el.name
+        if kind in skip or not (el.get('id') or el.get('name')):
+            continue
+        if kind == 'radio':
+            name = el['name']
+            if name not in radios:
+                group = el.find_parent(lambda tag: tag.name in ('fieldset', 'li') or 'field' in tag.get('class', []) or 'application-question' in tag.get('class', []))
+                label = group.select_one('legend, label, .application-label') if group else None
+                radios[name] = {
+                    'tag': 'input', 'type': 'radio', 'id': '', 'name': name, 'selector': f'input[name="{name}"]',
+                    'label': label.get_text(' ', strip=True) if label else '', 'required': el.has_attr('required'), 'options': [],
+                }
+                fields.append(radios[name])
+            radios[name]['options'].append({'value': el.get('value', 'on'), 'label': _label(soup, el)})
+            continue
+        fields.append({
+            'tag': el.name, 'type': kind, 'id': el.get('id', ''), 'name': el.get('name', ''),
+            'selector': '#' + soupsieve.escape(el['id']) if el.get('id') else f'{el.name}[name="{el["name"]}"]',
+            'label': _label(soup, el), 'required': el.has_attr('required'),
+            'options': [
+                {'value': option.get('value', option.get_text(strip=True)), 'label': option.get_text(' ', strip=True)}
+                for option in el.find_all('option')
+            ] if el.name == 'select' else [],
+        })
+    for field in fields:
+        field['sig'] = field_signature(field)
+    return fields
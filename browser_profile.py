@@ -0,0 +1,99 @@
+# how the Chrome sessions used for scraping and applying are set up
+# by default they run headless, stop waiting for a page at DOMContentLoaded (the explicit
+# waits in waits.py take it from there) and never download images, video, fonts or
+# third-party trackers; blocking happens in the browser through CDP, per page, so sites
+# that need some of it (captchas on ATS forms) can be allowlisted by domain
+from urllib.parse import urlparse
+
+from selenium import webdriver
+
+from throttle import throttle
+
+# url patterns (CDP wildcards) per kind of resource
+RESOURCE_PATTERNS = {
+    'image': ('*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*'),
+    'media': ('*.mp4*', '*.webm*', '*.mov*', '*.m3u8*', '*.mp3*', '*.ogg*', '*.wav*'),
+    'font': ('*.woff*', '*.ttf*', '*.otf*', '*.eot*'),
+}
+BLOCKED_KINDS = ('image', 'media', 'font')
+
+# analytics / ads / session recording, none of it is needed to read a page or submit a form
+TRACKERS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'googlesyndication.com',
+    'doubleclick.net', 'facebook.net', 'connect.facebook.com', 'hotjar.com', 'segment.io', 'segment.com',
+    'mixpanel.com', 'amplitude.com', 'fullstory.com', 'optimizely.com', 'nr-data.net', 'clarity.ms',
+    'bat.bing.com', 'ads.linkedin.com', 'snap.licdn.com', 'scorecardresearch.com', 'quantserve.com',
+    'criteo.com', 'taboola.com', 'outbrain.com',
+)
+
+# kinds of resources still loaded on pages of these domains (and their subdomains)
+# the ATS forms show image captchas (recaptcha / hcaptcha) before some submissions
+ALLOW = {
+    'greenhouse.io': ('image',),
+    'lever.co': ('image',),
+}
+
+def _host_matches(host, domain):
+    return host == domain or host.endswith('.' + domain)
+
+class BrowserProfile:
+    def __init__(self, headless=True, page_load_strategy='eager', block=BLOCKED_KINDS, block_trackers=True, allow=None):
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        self.block = tuple(block)
+        self.block_trackers = block_trackers
+        self.allow = ALLOW if allow is None else allow
+
+    def chrome_options(self):
+        options = webdriver.ChromeOptions()
+        options.page_load_strategy = self.page_load_strategy
+        if self.headless:
+            options.add_argument('--headless=new')
+            # the default headless window is tiny and sites serve their mobile layout to it
+            options.add_argument('--window-size=1366,900')
+        return options
+
+    @property
+    def blocks_anything(self):
+        return bool(self.block) or self.block_trackers
+
+    # the CDP url patterns to block while a page of url is open
+    def blocked_urls(self, url=None):
+        host = (urlparse(url).hostname or '') if url else ''
+        allowed = next((kinds for domain, kinds in self.allow.items() if _host_matches(host, domain)), ())
+        patterns = [pattern for kind in self.block if kind not in allowed for pattern in RESOURCE_PATTERNS[kind]]
+        if self.block_trackers:
+            patterns += [pattern for domain in TRACKERS for pattern in (f'*//{domain}/*', f'*.{domain}/*')]
+        return patterns
+
+    # turn on request blocking for a freshly started session
+    def install(self, driver):
+        driver.browser_profile = self
+        driver.blocked_urls = None
+        if self.blocks_anything:
+            driver.execute_cdp_cmd('Network.enable', {})
+            self.block_for(driver, None)
+
+    # swap the blocked patterns for the ones that fit url, only talks to the browser
+    # when they actually change (i.e. when moving between allowlisted and other sites)
+    def block_for(self, driver, url):
+        patterns = self.blocked_urls(url)
+        if patterns != driver.blocked_urls:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            driver.blocked_urls = patterns
+
+# visible window, used when a script starts its own browser (the glassdoor login is manual)
+VISIBLE = BrowserProfile(headless=False)
+# the pooled sessions in server.py
+HEADLESS = BrowserProfile()
+# a stock Chrome, to compare against
+FULL = BrowserProfile(headless=False, page_load_strategy='normal', block=(), block_trackers=False)
+
+# driver.get(url) with the blocking rules of the session's profile for that page
+# sessions that weren't started through driver_pool.new_chrome just get a plain driver.get
+# page loads count against the site's rate limit like any other request (see throttle.py)
+def open_page(driver, url):
+    profile = getattr(driver, 'browser_profile', None)
+    if profile is not None and profile.blocks_anything:
+        profile.block_for(driver, url)
+    throttle.call(url, lambda: driver.get(url))
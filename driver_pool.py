@@ -0,0 +1,145 @@
+# pool of warm browser sessions shared by the scraper and the applier
+# starting Chrome takes seconds, so sessions are kept around, cleaned between
+# jobs and only replaced after a number of uses or when they crash
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from browser_profile import HEADLESS, VISIBLE
+from tracing import span
+
+DEFAULT_DRIVER_PATH = '/usr/local/bin/chromedriver'
+POOL_SIZE = 2
+MAX_USES = 25 # recycle a session after this many jobs, long lived Chromes get slow and leaky
+
+# start a single Chrome session set up as described by profile (see browser_profile.py)
+def new_chrome(driver_path=DEFAULT_DRIVER_PATH, headless=False, profile=None):
+    profile = profile or (HEADLESS if headless else VISIBLE)
+    with span('chrome.start'):
+        driver = webdriver.Chrome(service=Service(executable_path=driver_path), options=profile.chrome_options())
+    try:
+        profile.install(driver)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+# factory for the pool, the pool calls it with no arguments whenever it needs a new session
+def chrome_factory(driver_path=DEFAULT_DRIVER_PATH, headless=True, profile=None):
+    return lambda: new_chrome(driver_path, headless, profile)
+
+class DriverPool:
+    def __init__(self, factory, size=POOL_SIZE, max_uses=MAX_USES):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue() # reuse the most recently used (hottest) session first
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses = {} # id(driver) -> number of jobs it has run
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # start sessions up front so the first jobs don't pay for Chrome startup
+    def warm(self, count=None):
+        count = self.size if count is None else min(count, self.size)
+        while self._idle.qsize() < count:
+            self._idle.put(self._create())
+
+    def _create(self):
+        driver = self.factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass # it's already dead, which is usually why we're here
+
+    # check the session still answers, a crashed chrome raises on any command
+    @staticmethod
+    def _alive(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    # get the session back to a blank state so nothing leaks between jobs
+    @staticmethod
+    def reset(driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        try:
+            driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+        except Exception:
+            pass # pages like about:blank don't have storage
+        try:
+            # clears cookies for every domain, delete_all_cookies only does the current one
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        except Exception:
+            driver.delete_all_cookies()
+        driver.get('about:blank')
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                return self._create()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, driver, failed):
+        try:
+            with self._lock:
+                uses = self._uses.get(id(driver), 0) + 1
+                self._uses[id(driver)] = uses
+
+            if self._closed or uses >= self.max_uses or (failed and not self._alive(driver)):
+                self._discard(driver)
+                return
+
+            try:
+                self.reset(driver)
+            except Exception:
+                self._discard(driver)
+                return
+            self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    # usage:
+    #     with pool.driver() as driver:
+    #         driver.get(...)
+    @contextmanager
+    def driver(self):
+        driver = self._acquire()
+        failed = False
+        try:
+            yield driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(driver, failed)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
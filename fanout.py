@@ -0,0 +1,126 @@
+# many searches (every job title x every location) at once, with a single glassdoor login
+# the session that logged in hands its cookies to a few worker browsers, each worker runs
+# searches off a shared queue, and every search start / results page download across all of
+# them goes through one rate limiter so glassdoor sees a steady trickle, not a burst
+# results are merged on the canonical url (see ledger.py), remembering which searches found each link
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ats_boards import BoardFetcher, matches
+from browser_profile import open_page
+from get_links import GLASSDOOR_HOME, login, search_links
+from ledger import canonical_url
+from pagination import MAX_RESULTS
+from tracing import span
+
+MAX_PARALLEL = 3 # worker browsers searching at once
+RATE = 1.0 # search starts + results page downloads per second, over all workers
+
+class RateLimiter:
+    def __init__(self, rate=RATE):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    # block until the next slot, slots are handed out in order at most rate per second
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def search_queries(job_titles, locations):
+    return [{'job_title': title, 'location': location} for title in job_titles for location in locations]
+
+# make a fresh browser look like the one that logged in
+def share_session(driver, cookies):
+    # cookies can only be set for the site that is open
+    open_page(driver, GLASSDOOR_HOME)
+    for cookie in cookies:
+        # chrome refuses the expiry / sameSite values get_cookies sometimes hands back
+        driver.add_cookie({key: value for key, value in cookie.items() if key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly')})
+    open_page(driver, GLASSDOOR_HOME)
+
+class FanOut:
+    # open_driver() returns a context manager yielding a browser, e.g. DriverPool.driver
+    def __init__(self, open_driver, max_parallel=MAX_PARALLEL, rate=RATE, max_results=MAX_RESULTS):
+        self.open_driver = open_driver
+        self.max_parallel = max_parallel
+        self.limiter = RateLimiter(rate)
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._seen = {} # canonical url -> the link it was first found as
+        self.found = {} # link -> [queries that found it]
+
+    # the same posting found through another search (maybe with other tracking params) is
+    # merged into the first link found for it, returns the links that are new
+    def _add(self, links, query):
+        new = set()
+        with self._lock:
+            for link in links:
+                link = self._seen.setdefault(canonical_url(link), link)
+                sources = self.found.setdefault(link, [])
+                if not sources:
+                    new.add(link)
+                if query not in sources:
+                    sources.append(query)
+        return new
+
+    def _worker(self, queries, cookies, on_result):
+        with self.open_driver() as driver:
+            share_session(driver, cookies)
+            while True:
+                try:
+                    query = queries.get_nowait()
+                except queue.Empty:
+                    return
+                self.limiter.wait()
+                with span('fanout.search') as s:
+                    try:
+                        links = search_links(driver, query['job_title'], query['location'], max_results=self.max_results, limiter=self.limiter)
+                    except Exception as e:
+                        print(f"ERROR: search {query} failed - {e}")
+                        s.tag(outcome='error', error=str(e))
+                        links = set()
+                        # start the next search from a known page
+                        open_page(driver, GLASSDOOR_HOME)
+                    new = self._add(links, query)
+                    s.tag(links=len(links), new=len(new))
+                if on_result:
+                    on_result(query, new)
+
+    # {link: [{'job_title', 'location'}, ...]} over every title x location
+    # boards (see ats_boards.py) are fetched once and matched against every query
+    # on_result(query, new_links) is called as each search finishes
+    # use_glassdoor=False only matches the boards, without opening a browser
+    def run(self, job_titles, locations, boards=None, on_result=None, use_glassdoor=True):
+        queries = search_queries(job_titles, locations)
+
+        if boards:
+            postings = BoardFetcher().fetch_all(boards, include_questions=False)
+            for query in queries:
+                links = {posting['url'] for posting in postings if matches(posting, query['job_title'], query['location'])}
+                new = self._add(links, query)
+                if on_result:
+                    on_result(query, new)
+        if not use_glassdoor:
+            return self.found
+
+        # one login, its cookies are reused by every worker
+        with self.open_driver() as driver:
+            if not login(driver):
+                return self.found
+            cookies = driver.get_cookies()
+
+        pending = queue.Queue()
+        for query in queries:
+            pending.put(query)
+        workers = min(self.max_parallel, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(self._worker, pending, cookies, on_result) for _ in range(workers)]:
+                future.result()
+        return self.found
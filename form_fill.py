@@ -0,0 +1,181 @@
+# fill a whole form with a single injected script instead of one send_keys per field
+# text inputs, selects, checkboxes and radio groups are set in the page and get the
+# input / change events a real user would fire; file inputs (which can't be set from
+# javascript) and anything that rejects the value fall back to send_keys
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from form_schema import FORM_FIELDS_JS, build_plan, cached_plan, choose_option, learn_form
+from tracing import span
+
+# defines fillSteps(steps), steps being [{selector, kind, value}], which returns the
+# selectors that couldn't be set
+FILL_JS = """
+const setNative = (el, prop, value) => {
+    // go through the prototype setter so frameworks like React notice the change
+    const proto = Object.getPrototypeOf(el);
+    const descriptor = Object.getOwnPropertyDescriptor(proto, prop);
+    if (descriptor && descriptor.set) descriptor.set.call(el, value); else el[prop] = value;
+};
+const fire = el => {
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.dispatchEvent(new Event('blur', {bubbles: true}));
+};
+// masked inputs (phone, dates) reformat what they're given, only the letters and digits have to survive
+const same = (a, b) => a.replace(/[^\\p{L}\\p{N}]/gu, '').toLowerCase() === b.replace(/[^\\p{L}\\p{N}]/gu, '').toLowerCase();
+const fillSteps = steps => {
+    const rejected = [];
+    for (const step of steps) {
+        try {
+            if (step.kind === 'radio') {
+                const el = document.querySelector(step.selector + '[value="' + CSS.escape(step.value) + '"]');
+                if (!el || el.disabled) { rejected.push(step.selector); continue; }
+                setNative(el, 'checked', true);
+                fire(el);
+                if (!el.checked) rejected.push(step.selector);
+                continue;
+            }
+            const el = document.querySelector(step.selector);
+            if (!el || el.disabled || el.readOnly) { rejected.push(step.selector); continue; }
+            if (step.kind === 'checkbox') {
+                setNative(el, 'checked', step.value);
+                fire(el);
+                if (el.checked !== step.value) rejected.push(step.selector);
+                continue;
+            }
+            el.focus();
+            setNative(el, 'value', step.value);
+            fire(el);
+            if (!same(el.value, step.value)) rejected.push(step.selector);
+        } catch (e) {
+            rejected.push(step.selector);
+        }
+    }
+    return rejected;
+};
+"""
+
+# arguments[0] is [{selector, kind, value}], returns the selectors that couldn't be set
+FILL_SCRIPT = FILL_JS + """
+return fillSteps(arguments[0]);
+"""
+
+# arguments[1] is the signatures of every field the plan knows (see form_schema.merge_plan):
+# when the form has a field that isn't one of them nothing is filled and the form's fields
+# come back as {url, fields}, else {rejected, present} with the signatures found on the form;
+# arguments[0] are the steps as for FILL_SCRIPT plus their sig, only the ones on the form are set
+PLAN_FILL_SCRIPT = FORM_FIELDS_JS + FILL_JS + """
+const fields = formFields();
+const known = new Set(arguments[1]);
+if (fields.some(field => !known.has(field.sig))) return {url: location.href, fields: fields};
+const present = new Set(fields.map(field => field.sig));
+return {rejected: fillSteps(arguments[0].filter(step => present.has(step.sig))), present: Array.from(present)};
+"""
+
+# the value a step is actually set to: option values for selects / radios, booleans for checkboxes
+def resolve_value(step, value):
+    if step['kind'] in ('select', 'radio'):
+        option = choose_option(step['options'], value)
+        return option['value'] if option else None
+    if step['kind'] == 'checkbox':
+        return str(value).lower() in ('yes', 'true', '1')
+    return str(value)
+
+def _send_keys(driver, step):
+    try:
+        el = driver.find_element(By.CSS_SELECTOR, step['selector'])
+        # a rejected text field may still hold whatever the script left in it, typing would append
+        if step['kind'] == 'text':
+            el.clear()
+        el.send_keys(step['value'])
+        return True
+    except WebDriverException as e:
+        print(f"Could not fill {step['selector']}: {e.msg}")
+        return False
+
+# steps is [{selector, kind, value}], returns the selectors that ended up filled
+def fill_fields(driver, steps):
+    scripted = [step for step in steps if step['kind'] != 'file']
+    with span('form.fill') as s:
+        rejected = set(driver.execute_script(FILL_SCRIPT, scripted)) if scripted else set()
+        s.tag(fields=len(scripted), rejected=len(rejected))
+    return _fill_rest(driver, steps, rejected)
+
+# like fill_fields, but only when every field on the open form is one of the known signatures:
+# returns (selectors filled, None), or (None, the form's fields) without filling anything
+def fill_known_fields(driver, steps, known):
+    scripted = [step for step in steps if step['kind'] != 'file']
+    with span('form.fill') as s:
+        result = driver.execute_script(PLAN_FILL_SCRIPT, scripted, known)
+        if 'fields' in result:
+            s.tag(outcome='unknown_form')
+            return None, result['fields']
+        s.tag(fields=len(scripted), rejected=len(result['rejected']))
+    present = set(result['present'])
+    return _fill_rest(driver, [step for step in steps if step['sig'] in present], set(result['rejected'])), None
+
+# what the script couldn't do: uploads, and typing into the text fields it couldn't set
+def _fill_rest(driver, steps, rejected):
+    scripted = [step for step in steps if step['kind'] != 'file']
+    filled = {step['selector'] for step in scripted if step['selector'] not in rejected}
+    # only typing can rescue a rejected text field, selects / radios / checkboxes just stay empty
+    fallback = [step for step in steps if step['kind'] == 'file' or (step['selector'] in rejected and step['kind'] == 'text')]
+    for step in fallback:
+        # file steps are the resume / cover letter upload
+        with span('form.upload' if step['kind'] == 'file' else 'form.type') as s:
+            if _send_keys(driver, step):
+                filled.add(step['selector'])
+            else:
+                s.tag(outcome='failed')
+    return filled
+
+# the fill_fields steps for every step of a fill plan we have a value for, and the
+# applicant field each selector belongs to
+def plan_steps(plan, values):
+    steps = []
+    fields_by_selector = {}
+    for step in plan:
+        value = values.get(step['field'])
+        if not value:
+            continue
+        value = resolve_value(step, value)
+        if value is None:
+            continue
+        steps.append({'selector': step['selector'], 'kind': step['kind'], 'value': value, 'sig': step.get('sig')})
+        fields_by_selector[step['selector']] = step['field']
+    return steps, fields_by_selector
+
+# fill every step of a fill plan (see form_schema.py) we have a value for,
+# returns the applicant fields that got filled
+def fill_from_plan(driver, plan, values):
+    steps, fields_by_selector = plan_steps(plan, values)
+    return {fields_by_selector[selector] for selector in fill_fields(driver, steps)}
+
+# fill the steps of the company's plan that keep(step) picks, straight from the cached plan
+# (one round trip) as long as every field on the form is one the plan has seen; a form with
+# a field it hasn't (another job's custom question) comes back unfilled, is folded into the
+# plan and filled from that, returns the applicant fields that got filled
+# url is the job's url if known (the company is read from it), else the browser is asked
+def fill_with_plan(driver, ats, values, keep=None, url=None, cache=None):
+    keep = keep or (lambda step: True)
+    url = url or driver.current_url
+    plan = cached_plan(ats, url, cache) or build_plan(driver, ats, cache, url)
+
+    steps, fields_by_selector = plan_steps([step for step in plan['steps'] if keep(step)], values)
+    if not any(step['kind'] != 'file' for step in steps):
+        # only uploads (lever's resume, after the rest of the form was filled and checked),
+        # one per input even if the plan knows it under several labels
+        steps = list({step['selector']: step for step in steps}.values())
+        return {fields_by_selector[selector] for selector in fill_fields(driver, steps)}
+
+    filled, fields = fill_known_fields(driver, steps, plan['known'])
+    if fields is not None:
+        plan = learn_form(ats, url, fields, cache)
+        steps, fields_by_selector = plan_steps([step for step in plan['steps'] if keep(step)], values)
+        filled, fields = fill_known_fields(driver, steps, plan['known'])
+    return {fields_by_selector[selector] for selector in filled or ()}
+
+# plain {selector: value} mapping of text fields, e.g. fill_fields(driver, text_steps({'#email': email}))
+def text_steps(mapping):
+    return [{'selector': selector, 'kind': 'text', 'value': str(value)} for selector, value in mapping.items()]
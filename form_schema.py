@@ -0,0 +1,292 @@
+# read an application form in one go and work out which applicant field goes where
+# one execute_script call returns every input / select / textarea with its label, the
+# result is turned into a "fill plan" that is cached per ATS + company, so the next
+# application to the same company fills straight from the plan without reading the form
+# first; the plan remembers every field it has seen on the company's forms, and a form with
+# a field it hasn't seen (another job's custom question) is learned before anything is
+# filled (see form_fill.fill_with_plan)
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from attachments import load_attachment
+from tracing import span
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fill_plans.sqlite3')
+
+# defines formFields(), which lists the page's fields as
+# [{tag, type, id, name, selector, label, required, options, sig}]
+# radio buttons come back as one field per group, hidden / submit inputs are skipped,
+# sig is the field's signature (see field_signature)
+FORM_FIELDS_JS = """
+const text = el => (el ? (el.innerText || el.textContent || '') : '').trim();
+const labelFor = el => {
+    if (el.id) {
+        const label = document.querySelector('label[for="' + CSS.escape(el.id) + '"]');
+        if (label) return text(label);
+    }
+    const wrapper = el.closest('label');
+    if (wrapper) return text(wrapper);
+    for (let prev = el.previousElementSibling; prev; prev = prev.previousElementSibling) {
+        if (prev.tagName === 'LABEL') return text(prev);
+    }
+    const field = el.closest('fieldset, .field, .application-question, li');
+    if (field) {
+        const label = field.querySelector('legend, label, .application-label');
+        if (label) return text(label);
+    }
+    return el.getAttribute('aria-label') || el.getAttribute('placeholder') || '';
+};
+const signature = f => [f.selector, f.type, f.label].concat(f.options.map(o => o.label)).join('\\u0001');
+const formFields = () => {
+    const skip = ['hidden', 'submit', 'button', 'reset', 'image'];
+    const fields = [];
+    const radios = {};
+    for (const el of document.querySelectorAll('input, select, textarea')) {
+        const type = el.tagName === 'INPUT' ? (el.type || 'text').toLowerCase() : el.tagName.toLowerCase();
+        if (skip.includes(type) || !(el.id || el.name)) continue;
+        if (type === 'radio') {
+            if (!radios[el.name]) {
+                radios[el.name] = {tag: 'input', type: 'radio', id: '', name: el.name,
+                    selector: 'input[name="' + CSS.escape(el.name) + '"]',
+                    label: text(el.closest('fieldset, .field, .application-question, li')?.querySelector('legend, label, .application-label')),
+                    required: el.required, options: []};
+                fields.push(radios[el.name]);
+            }
+            radios[el.name].options.push({value: el.value, label: labelFor(el)});
+            continue;
+        }
+        fields.push({
+            tag: el.tagName.toLowerCase(), type: type, id: el.id || '', name: el.name || '',
+            selector: el.id ? '#' + CSS.escape(el.id) : el.tagName.toLowerCase() + '[name="' + CSS.escape(el.name) + '"]',
+            label: labelFor(el), required: el.required,
+            options: el.tagName === 'SELECT' ? Array.from(el.options).map(o => ({value: o.value, label: text(o)})) : [],
+        });
+    }
+    for (const field of fields) field.sig = signature(field);
+    return fields;
+};
+"""
+
+# runs in the page, returns the page url and its fields
+EXTRACT_SCRIPT = FORM_FIELDS_JS + """
+return {url: location.href, fields: formFields()};
+"""
+
+# (applicant field, input kinds it applies to or None for any, keywords looked for in id / name / label)
+# first matching rule wins, so the more specific ones go first
+FIELD_RULES = [
+    ('resume', ('file',), ('resume', 'cv')),
+    ('cover_letter', ('file',), ('cover',)),
+    ('first_name', None, ('first name', 'firstname', 'given name')),
+    ('last_name', None, ('last name', 'lastname', 'surname', 'family name')),
+    ('email', None, ('email',)),
+    ('phone_number', None, ('phone', 'mobile')),
+    ('linkedin_profile', None, ('linkedin',)),
+    ('github_profile', None, ('github',)),
+    ('portfolio_link', None, ('portfolio', 'website', 'personal site')),
+    ('location', None, ('location',)),
+    ('grad_month', None, ('graduation month', 'end month', 'end date month')),
+    ('grad_year', None, ('graduation year', 'grad year', 'end year', 'end date year', 'year of graduation')),
+    ('college_name', None, ('school', 'university', 'college')),
+    ('degree', None, ('degree',)),
+    ('major', None, ('discipline', 'major', 'field of study')),
+    ('years_of_experience', None, ('years of experience', 'years of professional')),
+    ('sponsorship_required', None, ('sponsor',)),
+    ('work_authorization', None, ('authoriz', 'eligible to work', 'legally')),
+    ('disability', None, ('disability',)),
+    ('veteran_status', None, ('veteran',)),
+    ('how_heard', None, ('how did you hear', 'hear about')),
+]
+# 'name' on its own would match half the form, so full name only matches exactly
+FULL_NAME = ('name', 'full name', 'your name')
+
+def field_kind(field):
+    if field['tag'] in ('select', 'textarea'):
+        return 'select' if field['tag'] == 'select' else 'text'
+    if field['type'] in ('file', 'checkbox', 'radio'):
+        return field['type']
+    return 'text'
+
+def _normalize(value):
+    return ' '.join(re.sub(r'[_\-\[\]().:*?]', ' ', value or '').lower().split())
+
+# which applicant field (if any) a form field wants
+def match_field(field):
+    kind = field_kind(field)
+    id_name = [_normalize(field['id']), _normalize(field['name'])]
+    label = _normalize(field['label'])
+    haystack = ' '.join(id_name + [label])
+    for applicant_field, kinds, keywords in FIELD_RULES:
+        if kinds and kind not in kinds:
+            continue
+        if any(keyword in haystack for keyword in keywords):
+            return applicant_field
+    if kind == 'text' and any(value in FULL_NAME for value in id_name + [label]):
+        return 'full_name'
+    return None
+
+# the profile fields a blank may be filled in for from the resume (see attachments.field_hints)
+RESUME_HINTS = ('email', 'phone_number')
+
+# everything the form can be filled with, keyed by applicant field
+# a blank email / phone in the profile is filled in from the resume where it has one
+def applicant_values(profile):
+    values = dict(profile)
+    resume = load_attachment(profile.get('resume_path'))
+    if resume is not None:
+        values['resume_text'] = resume['text']
+        # resumes cached before field_hints was narrowed down may hint at more
+        for field in RESUME_HINTS:
+            if not values.get(field) and resume['hints'].get(field):
+                values[field] = resume['hints'][field]
+    full_name = values.get('full_name') or ''
+    # Assuming full_name can be split into first and last
+    values.setdefault('first_name', full_name.split(' ')[0] if ' ' in full_name else full_name)
+    values.setdefault('last_name', full_name.split(' ')[-1] if ' ' in full_name else '')
+    values.setdefault('how_heard', 'Glassdoor')
+    if values.get('resume_path'):
+        values['resume'] = resume['path'] if resume else os.path.abspath(values['resume_path'])
+    if values.get('cover_letter_path'):
+        values['cover_letter'] = os.path.abspath(values['cover_letter_path'])
+    return values
+
+# pick the option of a select / radio group that best fits a value
+def choose_option(options, value):
+    wanted = str(value).strip().lower()
+    if not wanted:
+        return None
+    labels = [(option, (option['label'] or option['value']).strip().lower()) for option in options]
+    for matcher in (lambda label: label == wanted, lambda label: label.startswith(wanted), lambda label: wanted in label):
+        for option, label in labels:
+            if label and matcher(label):
+                return option
+    return None
+
+# hash of the form's structure, changes whenever a field is added, removed or relabelled
+def form_hash(fields):
+    signature = [(f['selector'], f['type'], f['label'], [o['label'] for o in f['options']]) for f in fields]
+    return hashlib.sha1(json.dumps(signature, sort_keys=True).encode()).hexdigest()
+
+# identifies a field on a form: where it is, what it asks and which answers it offers
+# (same as signature() in FORM_FIELDS_JS)
+def field_signature(field):
+    return '\x01'.join([field['selector'], field['type'], field['label']] + [o['label'] for o in field['options']])
+
+# board.greenhouse.io/<company>/jobs/..., boards.greenhouse.io/embed/job_app?for=<company>&token=...
+# and jobs.lever.co/<company>/...
+def company_from_url(url):
+    parts = urlparse(url)
+    path = [part for part in parts.path.split('/') if part]
+    if path[:1] == ['embed']:
+        company = parse_qs(parts.query).get('for')
+        return company[0].lower() if company else parts.netloc
+    return path[0].lower() if path else parts.netloc
+
+def extract_form_schema(driver):
+    return driver.execute_script(EXTRACT_SCRIPT)
+
+# turn a schema into an ordered list of steps: {selector, kind, field, options, sig}
+# file inputs go last, lever auto-fills the rest of the form from the resume otherwise
+def build_fill_plan(fields):
+    steps = []
+    for field in fields:
+        applicant_field = match_field(field)
+        if applicant_field is None:
+            continue
+        steps.append({
+            'selector': field['selector'],
+            'kind': field_kind(field),
+            'field': applicant_field,
+            'options': field['options'],
+            'sig': field_signature(field),
+        })
+    steps.sort(key=lambda step: step['kind'] == 'file')
+    return steps
+
+# a company's plan, {known: signatures of every field seen on its forms, steps: fill steps},
+# with the fields of one more of its forms folded in
+def merge_plan(plan, fields):
+    plan = plan or {'known': [], 'steps': []}
+    known = set(plan['known'])
+    steps = plan['steps'] + [step for step in build_fill_plan(fields) if step['sig'] not in known]
+    steps.sort(key=lambda step: step['kind'] == 'file')
+    return {'known': sorted(known | {field_signature(field) for field in fields}), 'steps': steps}
+
+# plans on disk, with the ones already used in this process kept in memory so a hit is a
+# dict lookup, not a query (and nothing is written on a hit)
+class FillPlanCache:
+    def __init__(self, path=DEFAULT_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS company_plans ('
+            ' ats TEXT NOT NULL,'
+            ' company TEXT NOT NULL,'
+            ' form_hash TEXT NOT NULL,'
+            ' plan TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' PRIMARY KEY (ats, company))'
+        )
+        self._conn.commit()
+        self._plans = {} # (ats, company) -> plan
+
+    def get(self, ats, company):
+        key = (ats, company)
+        with self._lock:
+            if key not in self._plans:
+                row = self._conn.execute(
+                    'SELECT plan FROM company_plans WHERE ats = ? AND company = ?', key
+                ).fetchone()
+                plan = json.loads(row[0]) if row else None
+                # plans written before they remembered the fields they've seen are just a list of steps
+                if not isinstance(plan, dict):
+                    return None
+                self._plans[key] = plan
+            return self._plans[key]
+
+    # digest is the form_hash of the form the plan was last updated from, kept for debugging
+    def put(self, ats, company, digest, plan):
+        with self._lock:
+            self._plans[(ats, company)] = plan
+            self._conn.execute(
+                'INSERT OR REPLACE INTO company_plans VALUES (?, ?, ?, ?, ?)',
+                (ats, company, digest, json.dumps(plan), time.time()),
+            )
+            self._conn.commit()
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_plan_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FillPlanCache()
+        return _default_cache
+
+# the company's cached plan, without touching the form, or None if we have none yet
+def cached_plan(ats, url, cache=None):
+    cache = cache or default_plan_cache()
+    return cache.get(ats, company_from_url(url))
+
+# fold the fields of one of the company's forms into its plan, returns the updated plan
+def learn_form(ats, url, fields, cache=None):
+    cache = cache or default_plan_cache()
+    with span('form.plan', ats=ats) as s:
+        company = company_from_url(url)
+        plan = merge_plan(cache.get(ats, company), fields)
+        cache.put(ats, company, form_hash(fields), plan)
+        s.tag(company=company, fields=len(fields))
+    return plan
+
+# one round trip to read the open form, returns the company's plan with it learned
+# url is the job's url when the caller knows it, else the one the page reports
+def build_plan(driver, ats, cache=None, url=None):
+    schema = extract_form_schema(driver)
+    return learn_form(ats, url or schema['url'], schema['fields'], cache)
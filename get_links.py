@@ -1,5 +1,4 @@
 # selenium setup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
@@ -8,16 +7,25 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 # to find links
-from bs4 import BeautifulSoup
-import json
-import urllib.request
-import re
-
-import time # to sleep
+from ats_boards import get_board_links
+from browser_profile import open_page
+from driver_pool import new_chrome
+from link_extract import extract_jobs_from_driver
+from link_resolver import resolve_links
+from pagination import MAX_RESULTS, iter_pages
+from resolve_cache import default_cache
+from tracing import span, traced
+from waits import wait_for, wait_optional
+
+GLASSDOOR_HOME = 'https://www.glassdoor.com/index.htm'
+# the dropdown glassdoor opens under the location field once it has looked up what was typed
+LOCATION_SUGGESTIONS = "#sc\\.location ~ ul li, ul[role='listbox'] li, .autocomplete-suggestions li"
+SEARCH_BUTTON = "//*[@id='scBar']/div/button"
 
 # helper method to give user time to log into glassdoor
+@traced('login')
 def login(driver):
-    driver.get('https://www.glassdoor.com/index.htm')
+    open_page(driver, GLASSDOOR_HOME)
 
     # keep waiting for user to log-in until the URL changes to user page
     while True:
@@ -28,12 +36,11 @@ def login(driver):
     return True # return once this is complete
 
 # navigate to appropriate job listing page
+@traced('search')
 def go_to_listings(driver, position_title, location):
 
     # wait for the search bar to appear
-    element = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, "//*[@id='scBar']"))
-        )
+    element = wait_for(driver, 'search_bar', EC.presence_of_element_located((By.XPATH, "//*[@id='scBar']")))
 
     try:
         # look for search bar fields
@@ -46,9 +53,10 @@ def go_to_listings(driver, position_title, location):
         location_field.clear()
         location_field.send_keys(location)
 
-        # wait for a little so location gets set
-        time.sleep(1)
-        driver.find_element(By.XPATH, " //*[@id='scBar']/div/button").click()
+        # the location only counts once glassdoor has looked it up and offered suggestions,
+        # searching before that falls back to the previous location (there may be none, e.g. 'Remote')
+        wait_optional(driver, 'search_location', EC.visibility_of_element_located((By.CSS_SELECTOR, LOCATION_SUGGESTIONS)))
+        wait_for(driver, 'search_button', EC.element_to_be_clickable((By.XPATH, SEARCH_BUTTON))).click()
 
         # close a random popup if it shows up
         try:
@@ -59,122 +67,112 @@ def go_to_listings(driver, position_title, location):
         return True
 
     # note: please ignore all crappy error handling haha
-    except NoSuchElementException:
+    except (NoSuchElementException, TimeoutException):
         return False
 
-# aggregate all url links in a set
-def aggregate_links(driver):
-    allLinks = [] # all hrefs that exist on the page
-
+# all job hrefs on the results page currently open in the browser
+def page_hrefs(driver):
     # wait for page to fully load
-    element = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, "//*[@id='MainCol']/div[1]/ul"))
-        )
-
-    time.sleep(5)
-
-    # parse the page source using beautiful soup
-    page_source = driver.page_source
-    soup = BeautifulSoup(page_source)
-
-    # find all hrefs
-    allJobLinks = soup.findAll("a", {"class": "jobLink"})
-    allLinks = [jobLink['href'] for jobLink in allJobLinks]
-    allFixedLinks = []
-
-    # clean up the job links by opening, modifying, and 'unraveling' the URL
-    for link in allLinks:
-        # first, replace GD_JOB_AD with GD_JOB_VIEW
-        # this will replace the Glassdoor hosted job page to the proper job page
-        # hosted on most likely Greenhouse or Lever
-        link = link.replace("GD_JOB_AD", "GD_JOB_VIEW")
-
-        # if there is no glassdoor prefex, add that
-        # for example, /partner/jobListing.htm?pos=121... needs the prefix
-
-        if link[0] == '/':
-            link = f"https://www.glassdoor.com{link}"
-
-        # then, open up each url and save the result url
-        # because we got a 403 error when opening this normally, we have to establish the user agent
-        user_agent = 'Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7'
-        headers={'User-Agent':user_agent,}
-        request=urllib.request.Request(link,None,headers) #The assembled request
+    element = wait_for(driver, 'results', EC.presence_of_element_located((By.XPATH, "//*[@id='MainCol']/div[1]/ul")))
+
+    # then for the job cards to be rendered into it (a page can legitimately have none)
+    wait_optional(driver, 'job_links', EC.presence_of_element_located((By.CSS_SELECTOR, "#MainCol a.jobLink")))
+
+    # read the job cards straight from the DOM, no page_source to serialize and parse
+    # (see link_extract.py)
+    with span('extract') as s:
+        hrefs = [job['href'] for job in extract_jobs_from_driver(driver)]
+        s.tag(hrefs=len(hrefs))
+    return hrefs
+
+# clean up the job links by opening, modifying, and 'unraveling' the URL
+# every href on the page is resolved in parallel, see link_resolver.py
+# (returns a set, so duplicates are already gone)
+# listings we've already resolved before come straight out of the on-disk cache
+def resolve_hrefs(hrefs):
+    with span('resolve') as s:
+        links = resolve_links(hrefs, cache=default_cache())
+        s.tag(hrefs=len(hrefs), links=len(links))
+    return links
 
-        try:
-            # the url is on glassdoor itself, but once it's opened, it redirects - so let's store that
-            response = urllib.request.urlopen(request)
-            newLink = response.geturl()
-
-            # if the result url is from glassdoor, it's an 'easy apply' one and worth not saving
-            # however, this logic can be changed if you want to keep those
-            if "glassdoor" not in newLink:
-                allFixedLinks.append(newLink)
-        except Exception as e:
-            # Log the error instead of printing to console
-            print(f'ERROR: failed for {link} - {e}')
-
-    # convert to a set to eliminate duplicates
-    return set(allFixedLinks)
+# aggregate all url links in a set
+def aggregate_links(driver):
+    with span('aggregate_links') as s:
+        links = resolve_hrefs(page_hrefs(driver))
+        s.tag(links=len(links))
+    return links
 
 # Main method to iterate through all pages and aggregate URLs
-def get_job_links(job_title, location, radius, job_platform, driver_path='/usr/local/bin/chromedriver'):
+# job platforms that only read company job boards, without opening glassdoor at all
+BOARD_PLATFORMS = ('ats', 'greenhouse', 'lever')
+
+def uses_glassdoor(job_platform):
+    return (job_platform or '').lower() not in BOARD_PLATFORMS
+
+# on_page(page, links) is called after every results page with the new links found on it
+# max_results is the link budget, paging stops once it's reached
+# boards is {'greenhouse': [board tokens], 'lever': [company names]}, their postings
+# are read from the ATS APIs (reported as page 0) and added to the result
+def get_job_links(job_title, location, radius, job_platform, driver_path='/usr/local/bin/chromedriver', driver=None, on_page=None, boards=None, max_results=MAX_RESULTS):
+    with span('get_job_links', platform=job_platform) as s:
+        links = _job_links(job_title, location, radius, job_platform, driver_path, driver, on_page, boards, max_results)
+        s.tag(links=len(links))
+    return links
+
+def _job_links(job_title, location, radius, job_platform, driver_path='/usr/local/bin/chromedriver', driver=None, on_page=None, boards=None, max_results=MAX_RESULTS):
     # Note: The current implementation primarily supports Glassdoor.
     # 'radius' and 'job_platform' parameters are included for future expansion
     # and consistency with the API endpoint, but are not fully utilized here.
 
-    driver = webdriver.Chrome(executable_path=driver_path)
+    # known companies skip the browser entirely, see ats_boards.py
+    if boards:
+        with span('boards') as s:
+            boardLinks = get_board_links(boards, job_title, location)
+            s.tag(links=len(boardLinks))
+        if on_page:
+            on_page(0, boardLinks)
+        if not uses_glassdoor(job_platform):
+            return boardLinks
+        return boardLinks | _job_links(job_title, location, radius, job_platform, driver_path, driver, on_page, max_results=max_results)
+    if not uses_glassdoor(job_platform):
+        return set()
+
+    # a driver handed in (e.g. from server.py's DriverPool) belongs to the caller and is left open
+    if driver is None:
+        driver = new_chrome(driver_path)
+        try:
+            return _job_links(job_title, location, radius, job_platform, driver=driver, on_page=on_page, max_results=max_results)
+        finally:
+            driver.quit() # Use quit() to close browser and terminate WebDriver session
+
     success = login(driver)
     if not success:
         # close the page if it gets stuck at some point - this logic can be improved
-        driver.quit() # Use quit() to close browser and terminate WebDriver session
         return set() # Return empty set if login fails
 
+    return search_links(driver, job_title, location, on_page, max_results)
+
+# run one search in a browser that is already on glassdoor (and logged in), and page
+# through its results; limiter (see fanout.py) spaces out the result page downloads
+def search_links(driver, job_title, location, on_page=None, max_results=MAX_RESULTS, limiter=None):
     success = go_to_listings(driver, job_title, location) # Pass parameters here
     if not success:
-        driver.quit()
         return set() # Return empty set if navigation fails
 
+    # open a page in the browser, for when glassdoor refuses the plain HTTP download
+    def browser_hrefs(url):
+        open_page(driver, url)
+        return page_hrefs(driver)
+
+    # every page url is derived from the first one, the rest are fetched in parallel
+    # until we have max_results links or a page has nothing new, see pagination.py
     allLinks = set()
-    page = 1
-    next_url = ''
-    while page < 5: # pick an arbitrary number of pages so this doesn't run infinitely
-        print(f'\nNEXT PAGE #: {page}\n')
-
-        # on the first page, the URL is unique and doesn't have a field for the page number
-        if page == 1:
-            # aggregate links on first page
-            allLinks.update(aggregate_links(driver))
-
-            # find next page button and click it
-            next_page = driver.find_element(By.XPATH, "//*[@id='FooterPageNav']/div/ul/li[3]/a")
-            this_page = next_page.get_attribute('href')
-
-            # use regex to parse out the page number
-            m = re.search('(?P<url>[^;]*?)(?P<page>.htm\?p=)(?P<pagenum>.)', this_page)
-
-            # for page 2 onwards, there's a different page structure that we need to convert from
-            # (idk why it's like this tho)
-            # from: .../jobs-SRCH_IL.0,13_IC1147401_KE14,33.htm?p=2
-            # to: .../jobs-SRCH_IL.0,13_IC1147401_KE14,33_IP2.htm
-            page += 1 # increment page count
-            next_url = f"{m.group('url')}_IP{page}.htm" # update url with new page number
-            time.sleep(1) # just to give things time
-
-        # same patterns from page 2 onwards
-        if page >=2 :
-            # open page with new URL
-            driver.get(next_url)
-            # collect all the links
-            allLinks.update(aggregate_links(driver))
-            # run regex to get all reusable parts of URL
-            m = re.search('(?P<url>[^;]*?)(?P<pagenum>.)(?P<html>.htm)', next_url)
-            # increment page number for next time
-            page += 1
-            # update URL
-            next_url = f"{m.group('url')}{page}.htm"
-
-    driver.quit() # Use quit() to close browser and terminate WebDriver session
+    for page, pageLinks in iter_pages(driver, page_hrefs(driver), resolve_hrefs, browser_hrefs, max_results, limiter=limiter):
+        print(f'\nPAGE #: {page} ({len(pageLinks)} new links)\n')
+        allLinks.update(pageLinks)
+        if on_page:
+            on_page(page, pageLinks)
+
     return allLinks
 
 # for testing purpose
@@ -0,0 +1,150 @@
+# background jobs for the long Selenium workflows
+# submitting a job returns its id right away, a worker thread runs it and the
+# state (queued -> running -> done/failed, plus progress) is kept in SQLite so a
+# server restart picks up where it left off
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.sqlite3')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED = (DONE, FAILED)
+
+class JobStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' params TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' progress TEXT,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status)')
+        self._conn.commit()
+
+    def create(self, kind, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, json.dumps(params), QUEUED, now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    # fields is any of status / progress / result / error
+    def update(self, job_id, **fields):
+        for key in ('progress', 'result'):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f'{key} = ?' for key in fields)
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', [*fields.values(), job_id])
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ('params', 'progress', 'result'):
+            job[key] = json.loads(job[key]) if job[key] is not None else None
+        return job
+
+    # jobs that never finished, oldest first
+    def unfinished(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at', (QUEUED, RUNNING)
+            ).fetchall()
+        return [self.get(row['id']) for row in rows]
+
+class JobRunner:
+    # handlers maps a job kind to fn(params, report) -> result, where report(progress)
+    # can be called any number of times while the job runs
+    def __init__(self, store, handlers, workers=2):
+        self.store = store
+        self.handlers = handlers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._changed = threading.Condition()
+
+    def submit(self, kind, params):
+        if kind not in self.handlers:
+            raise ValueError(f'unknown job kind: {kind}')
+        job_id = self.store.create(kind, params)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    # put back everything that was queued or running when the server went down
+    def resume(self):
+        jobs = self.store.unfinished()
+        for job in jobs:
+            self.store.update(job['id'], status=QUEUED)
+            self._executor.submit(self._run, job['id'])
+        return len(jobs)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        self.store.update(job_id, status=RUNNING, error=None)
+        self._notify()
+
+        def report(progress):
+            self.store.update(job_id, progress=progress)
+            self._notify()
+
+        try:
+            result = self.handlers[job['kind']](job['params'], report)
+            self.store.update(job_id, status=DONE, result=result)
+        except Exception as e:
+            self.store.update(job_id, status=FAILED, error=str(e))
+        self._notify()
+
+    # yields the job every time it changes until it finishes, or None while nothing
+    # happened for `keepalive` seconds (so callers can send a heartbeat)
+    def watch(self, job_id, keepalive=15):
+        last_seen = None
+        while True:
+            # read and wait under the same lock so an update can't slip in between
+            with self._changed:
+                job = self.store.get(job_id)
+                if job is None:
+                    return
+                changed = job['updated_at'] != last_seen
+                if not changed and not self._changed.wait(timeout=keepalive):
+                    job = None
+            if changed:
+                last_seen = job['updated_at']
+                yield job
+                if job['status'] in FINISHED:
+                    return
+            elif job is None:
+                yield None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
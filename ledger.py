@@ -0,0 +1,143 @@
+# record of every job we've already applied to (or given up on), so scheduled runs
+# don't spend a browser session on the same posting twice
+# urls are canonicalized first, and greenhouse / lever postings are also matched by
+# their ATS job id, so the same job reached through different links is still caught
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ledger.sqlite3')
+
+APPLIED = 'applied'
+FAILED = 'failed' # worth another try
+FAILED_PERMANENTLY = 'failed_permanently'
+DONE = (APPLIED, FAILED_PERMANENTLY)
+
+MAX_ATTEMPTS = 3 # failures before a job is given up on
+
+# query params that only say where a click came from
+TRACKING_PARAMS = re.compile(r'^(utm_.*|gh_src|source|lever-source.*|lever-origin|ref|referrer|src|gclid|fbclid|mc_[a-z]+)$', re.IGNORECASE)
+
+GREENHOUSE_PATH = re.compile(r'^/(?P<company>[^/]+)/jobs/(?P<id>\d+)')
+LEVER_PATH = re.compile(r'^/(?P<company>[^/]+)/(?P<id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})', re.IGNORECASE)
+
+# greenhouse:<id> / lever:<uuid>, or None for anything else
+def ats_job_id(url):
+    parts = urlparse(url)
+    host = parts.netloc.lower()
+    query = dict(parse_qsl(parts.query))
+    if 'greenhouse.io' in host:
+        m = GREENHOUSE_PATH.match(parts.path)
+        if m:
+            return f"greenhouse:{m.group('id')}"
+        # embedded forms: boards.greenhouse.io/embed/job_app?for=<company>&token=<id>
+        if parts.path.rstrip('/') == '/embed/job_app' and query.get('token', '').isdigit():
+            return f"greenhouse:{query['token']}"
+    if 'lever.co' in host:
+        m = LEVER_PATH.match(parts.path)
+        if m:
+            return f"lever:{m.group('id').lower()}"
+    # greenhouse boards embedded on a company's own site carry the id as gh_jid
+    gh_jid = query.get('gh_jid')
+    if gh_jid and gh_jid.isdigit():
+        return f"greenhouse:{gh_jid}"
+    return None
+
+def canonical_url(url):
+    parts = urlparse(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    # jobs.lever.co/<company>/<id>/apply is the same posting as jobs.lever.co/<company>/<id>
+    if 'lever.co' in host and path.endswith('/apply'):
+        path = path[:-len('/apply')]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k)))
+    return urlunparse(('https', host, path, '', query, ''))
+
+class Ledger:
+    def __init__(self, path=DEFAULT_PATH, max_attempts=MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS ledger ('
+            ' canonical_url TEXT PRIMARY KEY,'
+            ' ats_job_id TEXT,'
+            ' status TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL,'
+            ' last_result TEXT,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ledger_ats_job_id_idx ON ledger (ats_job_id)')
+        self._conn.commit()
+
+    def _find(self, url):
+        canonical = canonical_url(url)
+        job_id = ats_job_id(url)
+        row = self._conn.execute(
+            'SELECT canonical_url, status, attempts FROM ledger WHERE canonical_url = ?', (canonical,)
+        ).fetchone()
+        if row is None and job_id is not None:
+            row = self._conn.execute(
+                'SELECT canonical_url, status, attempts FROM ledger WHERE ats_job_id = ?', (job_id,)
+            ).fetchone()
+        return row
+
+    def status(self, url):
+        with self._lock:
+            row = self._find(url)
+        return row[1] if row else None
+
+    # already applied to, or failed for good
+    def is_done(self, url):
+        return self.status(url) in DONE
+
+    # the urls that still need work, in their original order
+    def filter_new(self, urls):
+        return [url for url in urls if not self.is_done(url)]
+
+    # store the outcome of an application, returns the status it was recorded as
+    # links we can't apply to at all (not greenhouse / lever) fail permanently straight away
+    def record(self, url, applied, result=None):
+        with self._lock:
+            row = self._find(url)
+            attempts = (row[2] if row else 0) + 1
+            if applied:
+                status = APPLIED
+            elif ats_job_id(url) is None or attempts >= self.max_attempts:
+                status = FAILED_PERMANENTLY
+            else:
+                status = FAILED
+            key = row[0] if row else canonical_url(url)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO ledger VALUES (?, ?, ?, ?, ?, ?)',
+                (key, ats_job_id(url), status, attempts, result, time.time()),
+            )
+            self._conn.commit()
+        return status
+
+    # counts per status
+    def summary(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM ledger GROUP BY status').fetchall()
+        return dict(rows)
+
+# quick check of the url matching: python ledger.py
+if __name__ == '__main__':
+    ledger = Ledger(':memory:')
+    embed = 'https://boards.greenhouse.io/embed/job_app?for=acme&token=4012345001'
+    assert ats_job_id(embed) == 'greenhouse:4012345001'
+    assert ledger.record(embed, False) == FAILED and not ledger.is_done(embed)
+    # the same job through the board link, the embed on the company's site and the api's absolute_url
+    for url in ('https://boards.greenhouse.io/acme/jobs/4012345001', 'https://acme.example/careers?gh_jid=4012345001'):
+        assert ledger.status(url) == FAILED, url
+    assert ledger.record('https://boards.greenhouse.io/embed/job_app?token=4012345001&for=acme&gh_src=x', True) == APPLIED
+    assert ledger.is_done('https://boards.greenhouse.io/acme/jobs/4012345001')
+    lever = 'https://jobs.lever.co/acme/3f1c0a52-8d7e-4b1a-9c3e-0a1b2c3d4e01'
+    assert ledger.record(lever + '/apply', False) == FAILED and ledger.status(lever) == FAILED
+    assert ledger.record('https://example.com/careers/1', False) == FAILED_PERMANENTLY
+    print('ledger checks passed')
@@ -0,0 +1,91 @@
+# pull the job links (and the title / company / location shown next to them) out of a
+# glassdoor results page without building a tree of the whole multi-megabyte document
+# only the job cards are parsed; in the browser a single execute_script reads them
+# straight from the DOM so page_source never has to be serialized at all
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml is a lot faster than the builtin parser, but it's optional
+try:
+    import lxml # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+CARD_CLASS = 'react-job-listing'
+LINK_CLASS = 'jobLink'
+# strainers see the raw class attribute on newer beautifulsoup versions, so a plain
+# class name wouldn't match elements that have several classes
+CARD_STRAINER = SoupStrainer('li', class_=re.compile(rf'\b{CARD_CLASS}\b'))
+LINK_STRAINER = SoupStrainer('a', class_=re.compile(rf'\b{LINK_CLASS}\b'))
+
+# runs in the page, same output as extract_jobs
+EXTRACT_SCRIPT = """
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.innerText.trim() : '';
+};
+const jobs = [];
+const cards = document.querySelectorAll('li.react-job-listing');
+if (cards.length) {
+    for (const card of cards) {
+        const link = card.querySelector('a.jobLink');
+        if (!link || !link.getAttribute('href')) continue;
+        jobs.push({
+            href: link.getAttribute('href'),
+            title: card.dataset.normalizeJobTitle || text(card, "[data-test='job-link'], a.jobLink span, a.jobTitle") || link.innerText.trim(),
+            company: text(card, "[data-test='employer-short-name'], .jobHeader span, .jobEmpolyerName"),
+            location: card.dataset.jobLoc || text(card, "[data-test='emp-location'], .loc"),
+        });
+    }
+} else {
+    for (const link of document.querySelectorAll('a.jobLink')) {
+        if (!link.getAttribute('href')) continue;
+        jobs.push({href: link.getAttribute('href'), title: link.innerText.trim(), company: '', location: ''});
+    }
+}
+return jobs;
+"""
+
+def _text(card, *selectors):
+    for selector in selectors:
+        el = card.select_one(selector)
+        if el is not None:
+            text = el.get_text(' ', strip=True)
+            if text:
+                return text
+    return ''
+
+def _card_job(card):
+    link = card.find('a', class_=LINK_CLASS, href=True)
+    if link is None:
+        return None
+    return {
+        'href': link['href'],
+        'title': card.get('data-normalize-job-title') or _text(card, "[data-test='job-link']", 'a.jobLink span', 'a.jobTitle') or link.get_text(' ', strip=True),
+        'company': _text(card, "[data-test='employer-short-name']", '.jobHeader span', '.jobEmpolyerName'),
+        'location': card.get('data-job-loc') or _text(card, "[data-test='emp-location']", '.loc'),
+    }
+
+# [{href, title, company, location}] for every job card in the page, in page order
+def extract_jobs(page_source):
+    # only the <li> job cards get parsed into a tree, everything else is skipped
+    cards = BeautifulSoup(page_source, PARSER, parse_only=CARD_STRAINER)
+    jobs = [job for job in map(_card_job, cards.find_all('li', class_=CARD_CLASS)) if job]
+    if jobs:
+        return jobs
+
+    # older / simpler markup without cards: just the links
+    links = BeautifulSoup(page_source, PARSER, parse_only=LINK_STRAINER)
+    return [
+        {'href': link['href'], 'title': link.get_text(' ', strip=True), 'company': '', 'location': ''}
+        for link in links.find_all('a', class_=LINK_CLASS, href=True)
+    ]
+
+# same thing, read from the page open in the browser in one round trip
+def extract_jobs_from_driver(driver):
+    return driver.execute_script(EXTRACT_SCRIPT)
+
+def job_hrefs(page_source):
+    return [job['href'] for job in extract_jobs(page_source)]
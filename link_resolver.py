@@ -0,0 +1,115 @@
+# resolve Glassdoor job hrefs to their real (Greenhouse / Lever / ...) destinations
+# all hrefs on a results page are resolved in parallel instead of one at a time
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from throttle import throttle
+
+# because we got a 403 error when opening this normally, we have to establish the user agent
+USER_AGENT = 'Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7'
+
+MAX_WORKERS = 8 # max number of requests in flight at once
+PER_HOST_LIMIT = 4 # max number of requests in flight against a single host
+TIMEOUT = 10 # seconds per request
+
+# urllib turns a redirected HEAD into a GET, which downloads the whole body of the
+# final page - keep it a HEAD so we only ever read the headers
+class HeadRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new_request = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new_request is not None and req.get_method() == 'HEAD':
+            new_request.method = 'HEAD'
+        return new_request
+
+_opener = urllib.request.build_opener(HeadRedirectHandler)
+
+# turn a raw jobLink href into the url we actually want to open
+def normalize_link(link):
+    # first, replace GD_JOB_AD with GD_JOB_VIEW
+    # this will replace the Glassdoor hosted job page to the proper job page
+    # hosted on most likely Greenhouse or Lever
+    link = link.replace("GD_JOB_AD", "GD_JOB_VIEW")
+
+    # if there is no glassdoor prefex, add that
+    # for example, /partner/jobListing.htm?pos=121... needs the prefix
+    if link.startswith('/'):
+        link = f"https://www.glassdoor.com{link}"
+    return link
+
+# if the result url is from glassdoor, it's an 'easy apply' one and worth not saving
+# however, this logic can be changed if you want to keep those
+def is_external(url):
+    return "glassdoor" not in url
+
+# open a single url and return where it redirects to
+def resolve_link(link, timeout=TIMEOUT):
+    headers = {'User-Agent': USER_AGENT}
+    try:
+        # a HEAD is enough to follow the redirect chain without pulling the page body
+        request = urllib.request.Request(link, None, headers, method='HEAD')
+        with _opener.open(request, timeout=timeout) as response:
+            return response.geturl()
+    except urllib.error.HTTPError as e:
+        # some servers refuse HEAD, retry those with a plain GET (the body is never read)
+        if e.code not in (403, 405, 501):
+            raise
+    request = urllib.request.Request(link, None, headers)
+    with _opener.open(request, timeout=timeout) as response:
+        return response.geturl()
+
+class LinkResolver:
+    # cache is an optional resolve_cache.ResolveCache, known listings are answered from it
+    def __init__(self, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, timeout=TIMEOUT, cache=None):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.cache = cache
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, link):
+        host = urlparse(link).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _resolve(self, link):
+        with self._slot(link):
+            try:
+                # rate limited per host, throttled / failed requests are retried (see throttle.py)
+                return throttle.call(link, lambda: resolve_link(link, self.timeout))
+            except Exception as e:
+                print(f'ERROR: failed for {link} - {e}')
+                return None
+
+    # resolve every href and return the set of external job urls
+    def resolve_all(self, hrefs):
+        # the same listing often shows up twice on a page, only open it once
+        links = list(dict.fromkeys(normalize_link(href) for href in hrefs))
+        if not links:
+            return set()
+
+        known = self.cache.get_many(links) if self.cache is not None else {}
+        found = {url for url, external in known.values() if external}
+
+        to_fetch = [link for link in links if link not in known]
+        if not to_fetch:
+            return found
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_fetch))) as pool:
+            resolved = list(pool.map(self._resolve, to_fetch))
+
+        # failed lookups aren't cached so they get retried next time
+        results = [(link, url, is_external(url)) for link, url in zip(to_fetch, resolved) if url]
+        if self.cache is not None:
+            self.cache.put_many(results)
+
+        found.update(url for link, url, external in results if external)
+        return found
+
+def resolve_links(hrefs, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, timeout=TIMEOUT, cache=None):
+    return LinkResolver(max_workers, per_host_limit, timeout, cache).resolve_all(hrefs)
@@ -0,0 +1,143 @@
+# walk every results page of a glassdoor search
+# all page urls are known once the first page is loaded (plus the total result count),
+# so the rest are downloaded in parallel over plain HTTP with the browser's cookies,
+# and links are handed back page by page as each one finishes
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from link_extract import job_hrefs
+from throttle import throttle
+from tracing import span
+
+MAX_RESULTS = 300 # stop once this many job links were found
+MAX_PAGES = 30 # glassdoor doesn't serve more than 30 pages of results anyway
+CONCURRENCY = 4 # pages downloaded at once
+TIMEOUT = 20
+
+# the job count shown above the results, e.g. "1,234 Jobs" / "1.2k jobs"
+COUNT_SCRIPT = """
+const el = document.querySelector("[data-test='jobCount'], [data-test='search-title'], #MainColSummary, .jobsCount");
+return el ? el.innerText : null;
+"""
+COUNT = re.compile(r'([\d.,]+)\s*(k?)\+?\s*jobs', re.IGNORECASE)
+
+# the links of the pager under the results; the page's own url won't do, page 1 is often
+# a plain /Job/jobs.htm?sc.keyword=... url that has no _IP<n> pages
+NEXT_PAGE_SCRIPT = """
+return Array.from(document.querySelectorAll("#FooterPageNav a[href], a[data-test='pagination-next']")).map(a => a.href);
+"""
+
+# from: .../jobs-SRCH_IL.0,13_IC1147401_KE14,33.htm (or ..._IP3.htm, or ....htm?p=2)
+# to:   .../jobs-SRCH_IL.0,13_IC1147401_KE14,33
+SEARCH_URL = re.compile(r'(?P<base>.*-SRCH_[^/?#]*?)(?:_IP\d+)?\.htm')
+
+def search_base_url(url):
+    m = SEARCH_URL.match(url)
+    return m.group('base') if m else None
+
+# the search's base url from the pager's links, None when it has none we can page through
+def pager_base_url(driver):
+    try:
+        hrefs = driver.execute_script(NEXT_PAGE_SCRIPT) or []
+    except Exception:
+        return None
+    return next((base for base in map(search_base_url, hrefs) if base), None)
+
+# the first page is the plain url, page 2 onwards gets an _IP<n> suffix
+# (idk why it's like this tho)
+def page_url(base, page):
+    return f"{base}.htm" if page == 1 else f"{base}_IP{page}.htm"
+
+def parse_count(text):
+    m = COUNT.search(text or '')
+    if not m:
+        return None
+    number = m.group(1).replace(',', '')
+    return int(float(number) * 1000) if m.group(2) else int(float(number))
+
+def total_results(driver):
+    try:
+        return parse_count(driver.execute_script(COUNT_SCRIPT))
+    except Exception:
+        return None
+
+# how many pages we need: bounded by the results there are and the results we want
+def last_page(total, per_page, max_results=MAX_RESULTS):
+    per_page = max(per_page, 1)
+    pages = min(MAX_PAGES, math.ceil(max_results / per_page))
+    if total is not None:
+        pages = min(pages, math.ceil(total / per_page))
+    return max(pages, 1)
+
+# a requests session that looks like the logged in browser
+def session_from(driver):
+    session = requests.Session()
+    session.headers['User-Agent'] = driver.execute_script('return navigator.userAgent')
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return session
+
+def _get(session, url):
+    response = session.get(url, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response
+
+# download a results page without the browser, raises if it isn't one (blocked, captcha, ...)
+# limiter is anything with a wait() method, called before the request goes out
+def fetch_page_hrefs(session, url, limiter=None):
+    if limiter is not None:
+        limiter.wait()
+    with span('page.fetch') as s:
+        response = throttle.call(url, lambda: _get(session, url))
+        if 'MainCol' not in response.text:
+            raise ValueError(f'not a results page: {url}')
+        hrefs = job_hrefs(response.text)
+        s.tag(hrefs=len(hrefs))
+    return hrefs
+
+# yields (page, new links) as each page finishes, page 1 being the one open in the browser
+# first_hrefs are the hrefs already read from page 1, resolve(hrefs) turns hrefs into job
+# links and browser_hrefs(url) loads a page in the browser when plain HTTP gets refused
+def iter_pages(driver, first_hrefs, resolve, browser_hrefs=None, max_results=MAX_RESULTS, concurrency=CONCURRENCY, limiter=None):
+    seen = set(resolve(first_hrefs))
+    yield 1, set(seen)
+
+    base = pager_base_url(driver)
+    if base is None or len(seen) >= max_results:
+        return
+    pages = last_page(total_results(driver), len(first_hrefs), max_results)
+    session = session_from(driver)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # a wave of pages at a time, so an empty page stops us without fetching everything
+        for start in range(2, pages + 1, concurrency):
+            wave = range(start, min(start + concurrency, pages + 1))
+            futures = {pool.submit(fetch_page_hrefs, session, page_url(base, page), limiter): page for page in wave}
+            exhausted = False
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    hrefs = future.result()
+                except Exception as e:
+                    print(f'ERROR: failed to download page {page} - {e}')
+                    hrefs = []
+                    if browser_hrefs:
+                        # the browser can fail too (captcha page, timeout), that page is just lost
+                        try:
+                            hrefs = browser_hrefs(page_url(base, page))
+                        except Exception as e:
+                            print(f'ERROR: failed to load page {page} in the browser - {e}')
+
+                links = resolve(hrefs) - seen
+                seen |= links
+                yield page, links
+
+                if not links:
+                    exhausted = True # past the last page with anything new on it
+                if len(seen) >= max_results:
+                    return
+            if exhausted:
+                return
@@ -0,0 +1,108 @@
+# on-disk cache of resolved Glassdoor job links, so the same listing showing up on
+# another page (or in tomorrow's scrape) doesn't cost another network round trip
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resolve_cache.sqlite3')
+TTL = 7 * 24 * 60 * 60 # a week, postings get taken down or moved after a while
+MAX_ENTRIES = 50000
+
+# glassdoor partner links carry the listing id as jobListingId=... (or jl=...),
+# everything else in the url (pos, ao, s, guid, ...) changes between searches
+LISTING_ID = re.compile(r'[?&](?:jobListingId|jl)=(\d+)')
+# the per-search / per-click params of those links, none of them tell two listings apart
+VOLATILE_PARAMS = re.compile(r'^(pos|ao|s|guid|src|t|vt|cs|cb|uido|jrtk|ea|ctt|srs|gdir|cooc|rdserp|utm_.*)$', re.IGNORECASE)
+
+# None when nothing in the link tells its listing apart from others, those aren't cached
+def listing_key(link):
+    m = LISTING_ID.search(link)
+    if m:
+        return f"gd:{m.group(1)}"
+    # no id to go on, fall back to the url minus the params that change between searches
+    # (not the whole query string, that would lump every id-less listing under one key)
+    parts = urlparse(link)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not VOLATILE_PARAMS.match(k)))
+    if not query and parts.path.endswith('/jobListing.htm'):
+        return None
+    return urlunparse((parts.scheme, parts.netloc.lower(), parts.path, '', query, ''))
+
+class ResolveCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=TTL, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS resolved ('
+            ' listing_key TEXT PRIMARY KEY,'
+            ' resolved_url TEXT NOT NULL,'
+            ' external INTEGER NOT NULL,' # 0 means glassdoor hosted / easy apply
+            ' resolved_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS resolved_at_idx ON resolved (resolved_at)')
+        self._conn.commit()
+        self.evict()
+
+    # returns {link: (resolved_url, external)} for every link we already know about
+    def get_many(self, links):
+        keys = {}
+        for link in links:
+            key = listing_key(link)
+            if key is not None:
+                keys.setdefault(key, []).append(link)
+        if not keys:
+            return {}
+        cutoff = time.time() - self.ttl
+        placeholders = ','.join('?' * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT listing_key, resolved_url, external FROM resolved'
+                f' WHERE resolved_at >= ? AND listing_key IN ({placeholders})',
+                [cutoff, *keys],
+            ).fetchall()
+        return {link: (url, bool(external)) for key, url, external in rows for link in keys[key]}
+
+    # results is an iterable of (link, resolved_url, external)
+    def put_many(self, results):
+        now = time.time()
+        rows = [(listing_key(link), url, int(external), now) for link, url, external in results]
+        rows = [row for row in rows if row[0] is not None]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO resolved VALUES (?, ?, ?, ?)', rows)
+            self._conn.commit()
+        self.evict()
+
+    # drop expired entries, then the oldest ones if we're still over the size limit
+    def evict(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM resolved WHERE resolved_at < ?', (time.time() - self.ttl,))
+            self._conn.execute(
+                'DELETE FROM resolved WHERE listing_key IN ('
+                ' SELECT listing_key FROM resolved ORDER BY resolved_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM resolved').fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+# shared cache used by get_links.py, opened the first time it's needed
+def default_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResolveCache()
+        return _default_cache
@@ -0,0 +1,394 @@
+# unattended application runs, inside the server instead of a browser tab
+# vacancies wait in a persistent queue (SQLite, like jobs.py); a scheduler thread wakes
+# up on a schedule (every N minutes or a cron expression), takes a batch of pending
+# vacancies and applies to them on at most max_parallel browsers, never starting one
+# inside the quiet hours; the queue, the settings and whether it was running survive a
+# restart, and vacancies that were mid-application when the server died go back to pending
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from attachments import load_attachment
+from batch import apply_one
+from ledger import canonical_url
+from tracing import span
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scheduler.sqlite3')
+
+PENDING = 'pending'
+APPLYING = 'applying'
+APPLIED = 'applied'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+STATUSES = (PENDING, APPLYING, APPLIED, FAILED, SKIPPED)
+
+DEFAULT_CONFIG = {
+    'interval_minutes': 120, # used when there's no cron
+    'cron': None, # e.g. '0 9-18/3 * * 1-5', minute hour day month weekday (0 = sunday)
+    'batch_size': 3,
+    'max_parallel': 1, # browsers applying at once, capped by the driver pool
+    'quiet_hours': None, # {'start': '22:00', 'end': '07:00'}, server local time
+}
+
+# vacancies waiting to be applied to, oldest first, and what became of the ones that were
+class VacancyQueue:
+    def __init__(self, path=DEFAULT_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS vacancies ('
+            ' canonical_url TEXT PRIMARY KEY,'
+            ' url TEXT NOT NULL,'
+            ' title TEXT,'
+            ' company TEXT,'
+            ' location TEXT,'
+            ' status TEXT NOT NULL,'
+            ' result TEXT,'
+            ' added_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS vacancies_status_idx ON vacancies (status, added_at)')
+        # settings and on/off state of the scheduler, one json value per key
+        self._conn.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._conn.commit()
+
+    # vacancies are {'url', 'title', 'company', 'location'} (or just urls), returns how many were new
+    # a vacancy already queued (under any of its urls, see ledger.canonical_url) is left as it is
+    def add(self, vacancies):
+        now = time.time()
+        rows = []
+        for vacancy in vacancies:
+            if isinstance(vacancy, str):
+                vacancy = {'url': vacancy}
+            if not vacancy.get('url'):
+                continue
+            rows.append((canonical_url(vacancy['url']), vacancy['url'], vacancy.get('title'), vacancy.get('company'),
+                         vacancy.get('location'), PENDING, now, now))
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO vacancies (canonical_url, url, title, company, location, status, added_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows,
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    # the oldest `count` pending vacancies, marked as applying so nobody else takes them
+    def take(self, count):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM vacancies WHERE status = ? ORDER BY added_at LIMIT ?', (PENDING, count)
+            ).fetchall()
+            self._conn.executemany(
+                'UPDATE vacancies SET status = ?, updated_at = ? WHERE canonical_url = ?',
+                [(APPLYING, time.time(), row['canonical_url']) for row in rows],
+            )
+            self._conn.commit()
+        return [dict(row, status=APPLYING) for row in rows]
+
+    def finish(self, url, status, result=None):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE vacancies SET status = ?, result = ?, updated_at = ? WHERE canonical_url = ?',
+                (status, result, time.time(), canonical_url(url)),
+            )
+            self._conn.commit()
+
+    # a failed vacancy that's worth another try goes to the back of the line
+    def retry(self, url, result=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE vacancies SET status = ?, result = ?, added_at = ?, updated_at = ? WHERE canonical_url = ?',
+                (PENDING, result, now, now, canonical_url(url)),
+            )
+            self._conn.commit()
+
+    # put vacancies that were being applied to back in line, returns how many there were
+    def requeue(self, urls=None):
+        with self._lock:
+            if urls is None:
+                cursor = self._conn.execute('UPDATE vacancies SET status = ? WHERE status = ?', (PENDING, APPLYING))
+            else:
+                cursor = self._conn.executemany(
+                    'UPDATE vacancies SET status = ? WHERE canonical_url = ? AND status = ?',
+                    [(PENDING, canonical_url(url), APPLYING) for url in urls],
+                )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def list(self, status=None, limit=500):
+        query, args = 'SELECT * FROM vacancies', ()
+        if status:
+            query, args = query + ' WHERE status = ?', (status,)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY added_at LIMIT ?', (*args, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    # {status: count} for every status, zeros included
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM vacancies GROUP BY status').fetchall()
+        return {**dict.fromkeys(STATUSES, 0), **dict(rows)}
+
+    # drop vacancies, all of them or those in one status, returns how many went
+    def clear(self, status=None):
+        with self._lock:
+            if status:
+                cursor = self._conn.execute('DELETE FROM vacancies WHERE status = ?', (status,))
+            else:
+                cursor = self._conn.execute('DELETE FROM vacancies WHERE status != ?', (APPLYING,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def load_setting(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def save_setting(self, key, value):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO settings VALUES (?, ?)', (key, json.dumps(value)))
+            self._conn.commit()
+
+# --- when to run ---
+
+# one cron field (*, 5, 1-5, */15, 9-18/3, 1,15) -> the set of values it allows
+def _cron_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        part, _, step = part.partition('/')
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(n) for n in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step:
+                end = high # '5/15' means every 15 starting at 5
+        if start < low or end > high or start > end:
+            raise ValueError(f'{field!r} is out of range {low}-{high}')
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+class Cron:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'a cron expression has 5 fields (minute hour day month weekday): {expression!r}')
+        self.expression = expression
+        self.minutes = _cron_field(fields[0], 0, 59)
+        self.hours = _cron_field(fields[1], 0, 23)
+        self.days = _cron_field(fields[2], 1, 31)
+        self.months = _cron_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in _cron_field(fields[4], 0, 7)} # 0 and 7 are both sunday
+        # like cron, a restricted day and weekday match either one, not both
+        self._any_day = fields[2] != '*' and fields[4] != '*'
+
+    def _day_matches(self, dt):
+        day, weekday = dt.day in self.days, (dt.weekday() + 1) % 7 in self.weekdays
+        return day or weekday if self._any_day else day and weekday
+
+    # the first matching minute after dt
+    def next_after(self, dt):
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 4) # 29th of february on a monday, at worst
+        while dt < limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f'{self.expression!r} never matches')
+
+def _clock(text):
+    try:
+        hour, minute = (int(n) for n in text.split(':'))
+    except ValueError:
+        raise ValueError(f'not a time of day: {text!r}') from None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f'not a time of day: {text!r}')
+    return hour * 60 + minute
+
+class QuietHours:
+    # 'HH:MM' both, the range may wrap past midnight (22:00 - 07:00)
+    def __init__(self, start, end):
+        self.start = _clock(start)
+        self.end = _clock(end)
+
+    def contains(self, dt):
+        minute = dt.hour * 60 + dt.minute
+        if self.start <= self.end:
+            return self.start <= minute < self.end
+        return minute >= self.start or minute < self.end
+
+    # when the quiet hours dt is in are over
+    def end_after(self, dt):
+        end = dt.replace(hour=self.end // 60, minute=self.end % 60, second=0, microsecond=0)
+        return end if end > dt else end + timedelta(days=1)
+
+# the config with defaults filled in, raises ValueError on anything that doesn't make sense
+def validate_config(data):
+    config = {**DEFAULT_CONFIG, **{key: data[key] for key in DEFAULT_CONFIG if data.get(key) is not None}}
+    for key in ('interval_minutes', 'batch_size', 'max_parallel'):
+        if not isinstance(config[key], (int, float)) or isinstance(config[key], bool) or config[key] <= 0:
+            raise ValueError(f'{key} must be a positive number')
+    config['batch_size'] = int(config['batch_size'])
+    config['max_parallel'] = int(config['max_parallel'])
+    if config['cron']:
+        if not isinstance(config['cron'], str):
+            raise ValueError('cron must be a string like "0 9 * * 1-5"')
+        Cron(config['cron'])
+    quiet = config['quiet_hours']
+    if quiet:
+        if not isinstance(quiet, dict) or not isinstance(quiet.get('start'), str) or not isinstance(quiet.get('end'), str):
+            raise ValueError("quiet_hours must look like {'start': '22:00', 'end': '07:00'}")
+        QuietHours(quiet['start'], quiet['end'])
+    return config
+
+class Scheduler:
+    # pool is the DriverPool to borrow browsers from, ledger (optional) skips and records
+    # jobs like batch.run_batch does
+    def __init__(self, queue, pool, ledger=None):
+        self.queue = queue
+        self.pool = pool
+        self.ledger = ledger
+        self.config = validate_config(queue.load_setting('config', {}))
+        self.profile = queue.load_setting('profile')
+        self.next_run = None # epoch seconds
+        self.last_batch = queue.load_setting('last_batch')
+        self.applying = [] # urls being applied to right now
+        self._state = 'stopped'
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _schedule(self, cron, quiet, after):
+        dt = datetime.fromtimestamp(after)
+        dt = cron.next_after(dt) if cron else dt + timedelta(minutes=self.config['interval_minutes'])
+        if quiet and quiet.contains(dt):
+            dt = quiet.end_after(dt)
+        return dt.timestamp()
+
+    # start (or restart with new settings), run_now=True takes the first batch right away
+    # restarting waits for the applications already in progress to finish
+    def start(self, profile, config=None, run_now=True):
+        with self._lock:
+            if self.running:
+                self._stop.set()
+                self._thread.join()
+            self.config = validate_config(config or {})
+            self.profile = profile
+            self.queue.save_setting('config', self.config)
+            self.queue.save_setting('profile', profile)
+            self.queue.save_setting('running', True)
+            self._stop = threading.Event()
+            self.next_run = time.time() if run_now else None
+            self._thread = threading.Thread(target=self._loop, args=(self._stop,), name='scheduler', daemon=True)
+            self._thread.start()
+
+    # no new applications are started, the ones in progress finish on their own
+    def stop(self):
+        with self._lock:
+            self.queue.save_setting('running', False)
+            self._stop.set()
+            self.next_run = None
+
+    # after a restart: vacancies cut off mid-application go back to pending, and the
+    # scheduler starts again if it was running, returns whether it did
+    def resume(self):
+        self.queue.requeue()
+        if not self.queue.load_setting('running', False) or not self.profile:
+            return False
+        self.start(self.profile, self.config, run_now=False)
+        return True
+
+    def status(self):
+        if self.running:
+            state = 'stopping' if self._stop.is_set() else self._state
+        else:
+            state = 'stopped'
+        return {
+            'running': self.running and not self._stop.is_set(),
+            'state': state, # stopped / waiting / quiet / applying / stopping
+            'config': self.config,
+            'next_run': self.next_run,
+            'applying': list(self.applying),
+            'last_batch': self.last_batch,
+            'queue': self.queue.counts(),
+        }
+
+    def _loop(self, stop):
+        cron = Cron(self.config['cron']) if self.config['cron'] else None
+        quiet = QuietHours(**self.config['quiet_hours']) if self.config['quiet_hours'] else None
+        if self.next_run is None:
+            self.next_run = self._schedule(cron, quiet, time.time())
+
+        while not stop.is_set():
+            now = time.time()
+            if quiet and quiet.contains(datetime.fromtimestamp(now)):
+                self.next_run = max(self.next_run, quiet.end_after(datetime.fromtimestamp(now)).timestamp())
+                self._state = 'quiet'
+            else:
+                self._state = 'waiting'
+            if now < self.next_run:
+                # wake up now and then, so a changed clock (suspend, DST) can't oversleep much
+                stop.wait(min(self.next_run - now, 60))
+                continue
+
+            self._state = 'applying'
+            try:
+                self._run_batch(stop, quiet)
+            except Exception as e:
+                print(f'ERROR: scheduled batch failed - {e}')
+            # the next batch is counted from when this one started, like cron would
+            self.next_run = self._schedule(cron, quiet, now)
+
+    def _apply(self, vacancy, stop, quiet):
+        # stopped or quiet hours began while this one was waiting for a browser
+        if stop.is_set() or (quiet and quiet.contains(datetime.now())):
+            self.queue.requeue([vacancy['url']])
+            return None
+        self.applying.append(vacancy['url'])
+        try:
+            outcome = apply_one(vacancy['url'], self.profile, self.pool, self.ledger)
+        finally:
+            self.applying.remove(vacancy['url'])
+        # the ledger decides when to give up (see ledger.MAX_ATTEMPTS): a failure it hasn't marked
+        # as permanent, or one it didn't record at all (no browser, site unavailable), is retried
+        # in a later batch
+        if outcome['status'] == FAILED and self.ledger is not None and not self.ledger.is_done(vacancy['url']):
+            self.queue.retry(vacancy['url'], outcome['result'])
+        else:
+            self.queue.finish(vacancy['url'], outcome['status'], outcome['result'])
+        return outcome
+
+    def _run_batch(self, stop, quiet):
+        vacancies = self.queue.take(self.config['batch_size'])
+        if not vacancies:
+            return # nothing queued, keep waiting for more
+        batch = {'started_at': time.time(), 'finished_at': None, 'applied': 0, 'failed': 0, 'skipped': 0, 'requeued': 0}
+        self.last_batch = batch
+
+        with span('scheduler.batch') as s:
+            load_attachment(self.profile.get('resume_path'))
+            workers = min(self.config['max_parallel'], getattr(self.pool, 'size', 1), len(vacancies))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduled') as executor:
+                outcomes = list(executor.map(lambda vacancy: self._apply(vacancy, stop, quiet), vacancies))
+            for outcome in outcomes:
+                batch[outcome['status'] if outcome else 'requeued'] += 1
+            batch['finished_at'] = time.time()
+            s.tag(**{key: batch[key] for key in ('applied', 'failed', 'skipped', 'requeued')})
+        self.queue.save_setting('last_batch', batch)
@@ -1,7 +1,9 @@
+import json
 import os
 import sys
+import time
 from flask_cors import CORS
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 
 # Añadir el directorio actual al PATH de Python para poder importar los scripts
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -9,8 +11,20 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Importar las funciones principales de tus scripts
 # Asegúrate de que estas funciones no ejecuten sys.exit() o tengan lógica de main() que impida su importación
 try:
-    from get_links import get_job_links
+    from get_links import get_job_links, uses_glassdoor
+    from pagination import MAX_RESULTS
     from apply import auto_apply_to_job
+    from driver_pool import DriverPool, chrome_factory
+    from browser_profile import BLOCKED_KINDS, BrowserProfile
+    from batch import SUCCESS, batch_workers, profile_from, run_batch
+    from ledger import Ledger
+    from fanout import FanOut
+    from ats_boards import BoardFetcher
+    from jobs import JobRunner, JobStore
+    from scheduler import Scheduler, VacancyQueue, validate_config
+    from waits import profiler as wait_profiler
+    from tracing import tracer
+    from throttle import SiteUnavailable, throttle
 except ImportError as e:
     print(f"Error al importar scripts: {e}")
     print("Asegúrate de que get_links.py y apply.py estén en el mismo directorio y que sus funciones principales sean importables.")
@@ -20,6 +34,48 @@ except ImportError as e:
 app = Flask(__name__)
 CORS(app) # Habilitar CORS para todas las rutas
 
+# Sesiones de Chrome reutilizables compartidas por ambos endpoints (arrancar Chrome es lo más lento)
+DRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH', '/usr/local/bin/chromedriver')
+POOL_SIZE = int(os.environ.get('DRIVER_POOL_SIZE', '2'))
+MAX_USES_PER_DRIVER = int(os.environ.get('DRIVER_MAX_USES', '25'))
+# Sin ventana y sin imágenes / fuentes / video / rastreadores (ver browser_profile.py)
+# BROWSER_HEADLESS=0 muestra el navegador, BLOCK_RESOURCES=0 lo deja descargar todo
+BROWSER_HEADLESS = os.environ.get('BROWSER_HEADLESS', '1') != '0'
+BLOCK_RESOURCES = os.environ.get('BLOCK_RESOURCES', '1') != '0'
+browser_profile = BrowserProfile(
+    headless=BROWSER_HEADLESS,
+    block=BLOCKED_KINDS if BLOCK_RESOURCES else (),
+    block_trackers=BLOCK_RESOURCES,
+)
+driver_pool = DriverPool(chrome_factory(DRIVER_PATH, profile=browser_profile), size=POOL_SIZE, max_uses=MAX_USES_PER_DRIVER)
+
+# Registro de vacantes ya aplicadas (o descartadas) para no repetir trabajo
+ledger = Ledger()
+
+# Búsquedas por segundo (inicio de búsqueda + descarga de cada página) entre todas las sesiones
+SEARCH_RATE = float(os.environ.get('SEARCH_RATE', '1'))
+
+# Varios puestos x varias ciudades: un solo login, búsquedas en paralelo (ver fanout.py)
+# devuelve {enlace: [búsquedas que lo encontraron]} sin las vacantes ya procesadas
+def fan_out_links(job_titles, locations, job_platform, boards, max_results, on_result=None):
+    found = FanOut(driver_pool.driver, max_parallel=POOL_SIZE, rate=SEARCH_RATE, max_results=max_results).run(
+        job_titles, locations, boards, on_result, use_glassdoor=uses_glassdoor(job_platform)
+    )
+    return {link: found[link] for link in ledger.filter_new(found)}
+
+# job_titles / locations pueden ser listas; si falta alguna se usa job_title / location
+def search_lists(data):
+    job_titles = data.get('job_titles') or ([data['job_title']] if data.get('job_title') else [])
+    locations = data.get('locations') or ([data['location']] if data.get('location') else [])
+    return job_titles, locations
+
+# max_results opcional (tope de enlaces a reunir por búsqueda); None si no es un entero positivo
+def max_results_from(data):
+    max_results = data.get('max_results', MAX_RESULTS)
+    if isinstance(max_results, bool) or not isinstance(max_results, int) or max_results < 1:
+        return None
+    return max_results
+
 @app.route('/api/get_links', methods=['POST'])
 def get_links_endpoint():
     data = request.json
@@ -27,6 +83,20 @@ def get_links_endpoint():
     location = data.get('location')
     radius = data.get('radius')
     job_platform = data.get('job_platform')
+    boards = data.get('boards') # opcional: {"greenhouse": [...], "lever": [...]}
+    max_results = max_results_from(data)
+    if max_results is None:
+        return jsonify({"error": "max_results debe ser un entero positivo."}), 400
+
+    if 'job_titles' in data or 'locations' in data:
+        job_titles, locations = search_lists(data)
+        if not all([job_titles, locations, job_platform]) or not isinstance(job_titles, list) or not isinstance(locations, list):
+            return jsonify({"error": "Faltan parámetros: job_titles, locations (listas) y job_platform son requeridos."}), 400
+        try:
+            found = fan_out_links(job_titles, locations, job_platform, boards, max_results)
+            return jsonify({"links": list(found), "sources": found}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
 
     if not all([job_title, location, job_platform]):
         return jsonify({"error": "Faltan parámetros: job_title, location, job_platform son requeridos."}), 400
@@ -34,8 +104,31 @@ def get_links_endpoint():
     try:
         # Llama a la función de get_links.py
         # Asegúrate de que get_job_links devuelva una lista de enlaces o un formato JSON serializable
-        links = get_job_links(job_title, location, radius, job_platform)
-        return jsonify({"links": links}), 200
+        if uses_glassdoor(job_platform):
+            with driver_pool.driver() as driver:
+                links = get_job_links(job_title, location, radius, job_platform, driver=driver, boards=boards, max_results=max_results)
+        else:
+            # sólo tableros ATS: no hace falta navegador
+            links = get_job_links(job_title, location, radius, job_platform, boards=boards, max_results=max_results)
+        # quitar las vacantes a las que ya aplicamos
+        new_links = ledger.filter_new(links)
+        return jsonify({"links": new_links, "skipped": len(links) - len(new_links)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Vacantes abiertas (y sus preguntas) directamente de los tableros de Greenhouse / Lever
+@app.route('/api/boards', methods=['POST'])
+def boards_endpoint():
+    data = request.json
+    boards = data.get('boards')
+    include_questions = data.get('include_questions', True)
+
+    if not isinstance(boards, dict) or not boards:
+        return jsonify({"error": "Falta el parámetro boards, p. ej. {\"greenhouse\": [\"empresa\"]}."}), 400
+
+    try:
+        postings = BoardFetcher().fetch_all(boards, include_questions)
+        return jsonify({"postings": postings}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -66,18 +159,251 @@ def apply_endpoint():
     if not all([job_link, resume_path, full_name, email, phone_number]):
         return jsonify({"error": "Faltan parámetros esenciales para la aplicación."}), 400
 
+    # No volver a abrir un navegador para una vacante ya procesada
+    if ledger.is_done(job_link):
+        return jsonify({"message": "Vacante ya procesada", "result": ledger.status(job_link), "skipped": True}), 200
+
     try:
         # Llama a la función de apply.py
         # Asegúrate de que auto_apply_to_job maneje todos estos parámetros
-        result = auto_apply_to_job(
-            job_link, resume_path, cover_letter_path, full_name, email, phone_number,
-            linkedin_profile, github_profile, portfolio_link, years_of_experience,
-            grad_month, grad_year, college_name, degree, major, work_authorization,
-            sponsorship_required, disability, veteran_status
-        )
+        with driver_pool.driver() as driver:
+            result = auto_apply_to_job(
+                job_link, resume_path, cover_letter_path, full_name, email, phone_number,
+                linkedin_profile, github_profile, portfolio_link, years_of_experience,
+                grad_month, grad_year, college_name, degree, major, work_authorization,
+                sponsorship_required, disability, veteran_status, driver=driver
+            )
+        ledger.record(job_link, result == SUCCESS, result)
         return jsonify({"message": "Aplicación procesada", "result": result}), 200
+    except SiteUnavailable as e:
+        # el sitio no responde o nos limita: no cuenta como intento fallido en el registro
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/apply/batch', methods=['POST'])
+def apply_batch_endpoint():
+    data = request.json
+    job_links = data.get('job_links')
+    profile = profile_from(data.get('profile') or {})
+    workers = data.get('workers') # opcional, por defecto una por sesión del pool
+
+    if not isinstance(job_links, list) or not job_links:
+        return jsonify({"error": "Falta el parámetro job_links (lista de enlaces)."}), 400
+    if not all([profile['resume_path'], profile['full_name'], profile['email'], profile['phone_number']]):
+        return jsonify({"error": "Faltan parámetros esenciales en profile."}), 400
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        return jsonify({"error": "workers debe ser un entero positivo."}), 400
+
+    try:
+        start = time.perf_counter()
+        results = run_batch(job_links, profile, driver_pool, workers, ledger)
+        response = {
+            "results": results,
+            "applied": sum(1 for r in results if r["status"] == "applied"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "skipped": sum(1 for r in results if r["status"] == "skipped"),
+            "seconds": round(time.perf_counter() - start, 3),
+            # los que realmente corrieron a la vez, nunca más que sesiones tiene el pool
+            "workers": batch_workers(job_links, driver_pool, workers),
+        }
+        if workers is not None and workers > driver_pool.size:
+            response["warning"] = f"workers limitado a {driver_pool.size} (DRIVER_POOL_SIZE, sesiones de navegador del pool)."
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Cuántas vacantes hay en el registro por estado (applied / failed / failed_permanently)
+@app.route('/api/ledger', methods=['GET'])
+def ledger_summary():
+    return jsonify(ledger.summary()), 200
+
+# Cuánto tardó cada espera de Selenium por paso (count / total / mean / max / timeouts)
+@app.route('/api/profile/waits', methods=['GET'])
+def wait_profile():
+    return jsonify(wait_profiler.summary()), 200
+
+# Reinicia los contadores, p. ej. antes de medir un lote
+@app.route('/api/profile/waits', methods=['DELETE'])
+def reset_wait_profile():
+    wait_profiler.reset()
+    return jsonify({"message": "Perfil de esperas reiniciado"}), 200
+
+# Histogramas de duración por etapa (arranque de Chrome, carga, formulario, envío...) en formato Prometheus
+# más los contadores de peticiones por host (límites, 429 / 403, reintentos, circuitos abiertos)
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    return Response(tracer.metrics() + throttle.metrics(), mimetype='text/plain; version=0.0.4')
+
+# Estado del limitador por host en JSON: ritmo actual, reintentos, esperas y circuitos por ATS
+@app.route('/api/throttle', methods=['GET'])
+def throttle_status():
+    return jsonify(throttle.summary()), 200
+
+# Las últimas etapas registradas, una por línea en JSON (ver tracing.py)
+@app.route('/api/traces', methods=['GET'])
+def traces():
+    return Response(tracer.dump(), mimetype='application/x-ndjson')
+
+# Reinicia histogramas y trazas, p. ej. antes de medir un lote
+@app.route('/api/metrics', methods=['DELETE'])
+def reset_metrics():
+    tracer.reset()
+    return jsonify({"message": "Métricas reiniciadas"}), 200
+
+# --- Trabajos en segundo plano ---
+# El flujo de Selenium puede tardar minutos; estos endpoints devuelven un job_id de inmediato
+# y el progreso se consulta con GET /api/jobs/<id> (o en vivo con /api/jobs/<id>/events)
+
+def run_get_links_job(params, report):
+    found = set()
+
+    if params.get('job_titles') or params.get('locations'):
+        job_titles, locations = search_lists(params)
+
+        # publicar los enlaces encontrados búsqueda por búsqueda
+        def on_result(query, links):
+            found.update(ledger.filter_new(links))
+            report({"query": query, "links": sorted(found)})
+
+        sources = fan_out_links(job_titles, locations, params['job_platform'], params.get('boards'), params['max_results'], on_result)
+        return {"links": sorted(sources), "sources": sources}
+
+    # publicar los enlaces encontrados página por página (sin los ya procesados)
+    def on_page(page, links):
+        found.update(ledger.filter_new(links))
+        report({"page": page, "links": sorted(found)})
+
+    args = (params['job_title'], params['location'], params.get('radius'), params['job_platform'])
+    if uses_glassdoor(params['job_platform']):
+        with driver_pool.driver() as driver:
+            links = get_job_links(*args, driver=driver, on_page=on_page, boards=params.get('boards'), max_results=params['max_results'])
+    else:
+        links = get_job_links(*args, on_page=on_page, boards=params.get('boards'), max_results=params['max_results'])
+    return {"links": sorted(ledger.filter_new(links))}
+
+# si el sitio no está disponible (SiteUnavailable) el trabajo falla sin anotarse en el registro
+def run_apply_job(params, report):
+    if ledger.is_done(params['job_link']):
+        return {"message": "Vacante ya procesada", "result": ledger.status(params['job_link']), "skipped": True}
+    with driver_pool.driver() as driver:
+        result = auto_apply_to_job(params['job_link'], **profile_from(params), driver=driver)
+    ledger.record(params['job_link'], result == SUCCESS, result)
+    return {"message": "Aplicación procesada", "result": result}
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', str(POOL_SIZE)))
+job_runner = JobRunner(JobStore(), {'get_links': run_get_links_job, 'apply': run_apply_job}, workers=JOB_WORKERS)
+
+@app.route('/api/jobs/get_links', methods=['POST'])
+def submit_get_links_job():
+    data = request.json
+    params = {key: data.get(key) for key in ('job_title', 'location', 'radius', 'job_platform', 'boards', 'job_titles', 'locations')}
+    params['max_results'] = max_results_from(data)
+    if params['max_results'] is None:
+        return jsonify({"error": "max_results debe ser un entero positivo."}), 400
+
+    job_titles, locations = search_lists(params)
+    if not all([job_titles, locations, params['job_platform']]):
+        return jsonify({"error": "Faltan parámetros: job_title(s), location(s), job_platform son requeridos."}), 400
+
+    job_id = job_runner.submit('get_links', params)
+    return jsonify({"job_id": job_id}), 202
+
+@app.route('/api/jobs/apply', methods=['POST'])
+def submit_apply_job():
+    data = request.json
+    params = {"job_link": data.get('job_link'), **profile_from(data)}
+
+    if not all([params['job_link'], params['resume_path'], params['full_name'], params['email'], params['phone_number']]):
+        return jsonify({"error": "Faltan parámetros esenciales para la aplicación."}), 400
+
+    job_id = job_runner.submit('apply', params)
+    return jsonify({"job_id": job_id}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado."}), 404
+    return jsonify(job), 200
+
+# Server-sent events: un evento por cada cambio del trabajo hasta que termina
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if job_runner.get(job_id) is None:
+        return jsonify({"error": "Trabajo no encontrado."}), 404
+
+    def stream():
+        for job in job_runner.watch(job_id):
+            if job is None:
+                yield ": keepalive\n\n" # evita que el navegador cierre la conexión
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream')
+
+# --- Programador ---
+# Aplica por lotes desde una cola persistente de vacantes sin depender de una pestaña abierta
+# (intervalo o expresión cron, tamaño de lote, aplicaciones en paralelo y horas de silencio, ver scheduler.py)
+
+scheduler = Scheduler(VacancyQueue(), driver_pool, ledger)
+
+# Añade vacantes a la cola: {"vacancies": [{"url", "title", "company", "location"}, ...]} o {"job_links": [...]}
+@app.route('/api/scheduler/queue', methods=['POST'])
+def queue_vacancies():
+    data = request.json
+    vacancies = data.get('vacancies') or data.get('job_links')
+    if not isinstance(vacancies, list) or not vacancies:
+        return jsonify({"error": "Falta el parámetro vacancies (lista de vacantes o enlaces)."}), 400
+
+    added = scheduler.queue.add(vacancies)
+    return jsonify({"added": added, "queue": scheduler.queue.counts()}), 200
+
+# Vacantes en la cola con su estado (?status=pending para filtrar)
+@app.route('/api/scheduler/queue', methods=['GET'])
+def list_queue():
+    status = request.args.get('status')
+    return jsonify({"vacancies": scheduler.queue.list(status)}), 200
+
+# Vacía la cola (o sólo un estado con ?status=applied); las que se están aplicando se quedan
+@app.route('/api/scheduler/queue', methods=['DELETE'])
+def clear_queue():
+    removed = scheduler.queue.clear(request.args.get('status'))
+    return jsonify({"removed": removed, "queue": scheduler.queue.counts()}), 200
+
+# Arranca (o reconfigura) el programador: {"profile": {...}, "interval_minutes" o "cron", "batch_size",
+# "max_parallel", "quiet_hours": {"start": "22:00", "end": "07:00"}, "run_now": true}
+@app.route('/api/scheduler/start', methods=['POST'])
+def start_scheduler():
+    data = request.json
+    profile = profile_from(data.get('profile') or {})
+    if not all([profile['resume_path'], profile['full_name'], profile['email'], profile['phone_number']]):
+        return jsonify({"error": "Faltan parámetros esenciales en profile."}), 400
+    try:
+        config = validate_config(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    scheduler.start(profile, config, run_now=data.get('run_now', True))
+    return jsonify(scheduler.status()), 200
+
+# Deja de tomar vacantes; las aplicaciones en curso terminan solas
+@app.route('/api/scheduler/stop', methods=['POST'])
+def stop_scheduler():
+    scheduler.stop()
+    return jsonify(scheduler.status()), 200
+
+# Estado, configuración, próxima ejecución (epoch), último lote y vacantes por estado
+@app.route('/api/scheduler', methods=['GET'])
+def scheduler_status():
+    return jsonify(scheduler.status()), 200
+
 if __name__ == '__main__':
+    # Con debug=True el reloader lanza un segundo proceso; sólo el que atiende peticiones reanuda trabajos
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resumed = job_runner.resume()
+        if resumed:
+            print(f"Reanudando {resumed} trabajos pendientes.")
+        if scheduler.resume():
+            print("Programador reanudado.")
     app.run(debug=True, port=5000) # El servidor se ejecutará en http://localhost:5000
\ No newline at end of file
@@ -4,7 +4,7 @@ import './styles.css';
 import { Briefcase, Link, MapPin, Search, Bot, Play, Square, Timer } from 'lucide-react';
 
 // --- Tipos de Datos ---
-type JobStatus = 'pending' | 'applying' | 'applied' | 'failed';
+type JobStatus = 'pending' | 'applying' | 'applied' | 'failed' | 'skipped';
 
 interface Vacancy {
     id: number;
@@ -15,6 +15,57 @@ interface Vacancy {
     status: JobStatus;
 }
 
+// Una vacante en la cola del programador del servidor
+interface QueuedVacancy {
+    url: string;
+    title: string | null;
+    company: string | null;
+    location: string | null;
+    status: JobStatus;
+    result: string | null;
+}
+
+interface SchedulerStatus {
+    running: boolean;
+    state: 'stopped' | 'waiting' | 'quiet' | 'applying' | 'stopping';
+    next_run: number | null; // epoch en segundos
+    applying: string[];
+    last_batch: { started_at: number; finished_at: number | null; applied: number; failed: number; skipped: number; requeued: number } | null;
+    queue: Record<JobStatus, number>;
+}
+
+const SCHEDULER_STATES: Record<SchedulerStatus['state'], string> = {
+    stopped: 'Detenido',
+    waiting: 'Activo',
+    quiet: 'En horas de silencio',
+    applying: 'Aplicando...',
+    stopping: 'Deteniendo...',
+};
+
+// Cada cuánto se consulta el estado del programador (sólo para mostrarlo, los lotes corren en el servidor)
+const STATUS_POLL_MS = 5000;
+
+const PROFILE = {
+    resume_path: "C:\\Users\\HP\\Documents\\hiramDev\\auto apply job scraper\\resume.pdf", // IMPORTANT: Update this path to your actual resume.pdf
+    cover_letter_path: "", // Optional, provide path if you have one
+    full_name: "John Doe", // Placeholder
+    email: "john.doe@example.com", // Placeholder
+    phone_number: "123-456-7890", // Placeholder
+    linkedin_profile: "https://www.linkedin.com/in/johndoe", // Placeholder
+    github_profile: "https://github.com/johndoe", // Placeholder
+    portfolio_link: "https://www.johndoe.com", // Placeholder
+    years_of_experience: "5", // Placeholder
+    grad_month: "05", // Placeholder
+    grad_year: "2015", // Placeholder
+    college_name: "University of Placeholder", // Placeholder
+    degree: "Bachelor", // Placeholder
+    major: "Computer Science", // Placeholder
+    work_authorization: "US Citizen", // Placeholder
+    sponsorship_required: "No", // Placeholder
+    disability: "No", // Placeholder
+    veteran_status: "No" // Placeholder
+};
+
 // --- Datos de Ejemplo (Simulando una respuesta del Backend) ---
 const dummyVacancies: Vacancy[] = [
     { id: 1, title: 'Frontend Developer (React)', company: 'Tech Solutions Inc.', location: 'Remoto', url: '#', status: 'pending' },
@@ -37,136 +88,122 @@ const App: React.FC = () => {
 
     const [vacancies, setVacancies] = useState<Vacancy[]>([]);
     const [isScraping, setIsScraping] = useState(false);
-    const [isApplying, setIsApplying] = useState(false);
     const [error, setError] = useState<string | null>(null);
     const [logs, setLogs] = useState<string[]>([]);
 
     // --- Estado del Programador (Scheduler) ---
+    // El programador corre en el servidor (ver scheduler.py); aquí sólo se configura y se consulta su estado
     const [jobsPerBatch, setJobsPerBatch] = useState(3);
     const [intervalHours, setIntervalHours] = useState(2);
-    const [isSchedulerRunning, setIsSchedulerRunning] = useState(false);
-    const [nextRunTime, setNextRunTime] = useState<number | null>(null);
+    const [maxParallel, setMaxParallel] = useState(1);
+    const [quietStart, setQuietStart] = useState('');
+    const [quietEnd, setQuietEnd] = useState('');
+    const [schedulerStatus, setSchedulerStatus] = useState<SchedulerStatus | null>(null);
     const [countdown, setCountdown] = useState('');
 
-    const schedulerTimerRef = useRef<NodeJS.Timeout | null>(null);
-    const runBatchCallbackRef = useRef<() => void>();
-
-    const handleStopScheduler = useCallback(() => {
-        setIsSchedulerRunning(false);
-        if (schedulerTimerRef.current) {
-            clearInterval(schedulerTimerRef.current);
-            schedulerTimerRef.current = null;
-        }
-        setNextRunTime(null);
-        setIsApplying(false);
-        setLogs(prev => [...prev, '--- Programador detenido ---']);
-    }, []);
-
-    const runApplicationBatch = useCallback(async () => {
-        setIsApplying(true);
-        setLogs(prev => [...prev, '--- Iniciando nuevo lote de aplicaciones ---']);
+    const lastBatchRef = useRef<number | null>(null);
+    const queueRestoredRef = useRef(false);
 
-        let vacanciesToApply: Vacancy[] = [];
-        let noMoreJobs = false;
+    const isSchedulerRunning = schedulerStatus?.running ?? false;
+    const isApplying = schedulerStatus?.state === 'applying';
+    const nextRunTime = schedulerStatus?.next_run ? schedulerStatus.next_run * 1000 : null;
+    const pendingCount = schedulerStatus?.queue.pending ?? 0;
 
-        setVacancies(currentVacancies => {
-            vacanciesToApply = currentVacancies.filter(v => v.status === 'pending').slice(0, jobsPerBatch);
-
-            if (vacanciesToApply.length === 0) {
-                noMoreJobs = true;
-                return currentVacancies;
+    // Estado del programador y de la cola; las vacantes de la lista toman el estado que tienen en el servidor
+    const refreshScheduler = useCallback(async () => {
+        try {
+            const [statusResponse, queueResponse] = await Promise.all([
+                fetch('http://localhost:5000/api/scheduler'),
+                fetch('http://localhost:5000/api/scheduler/queue'),
+            ]);
+            if (!statusResponse.ok || !queueResponse.ok) {
+                return;
             }
-
-            const applyingIds = new Set(vacanciesToApply.map(v => v.id));
-            return currentVacancies.map(v =>
-                applyingIds.has(v.id) ? { ...v, status: 'applying' as JobStatus } : v
-            );
-        });
-
-        if (noMoreJobs) {
-            setLogs(prev => [...prev, 'No hay más vacantes pendientes. Deteniendo el programador.']);
-            handleStopScheduler();
-            return;
-        }
-
-        for (const vacancy of vacanciesToApply) {
-            setLogs(prev => [...prev, `[Lote] Aplicando a: "${vacancy.title}" en ${vacancy.company}`]);
-
-            let success = false;
-            try {
-                const response = await fetch('http://localhost:5000/api/apply', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        job_link: vacancy.url,
-                        resume_path: "C:\\Users\\HP\\Documents\\hiramDev\\auto apply job scraper\\resume.pdf", // IMPORTANT: Update this path to your actual resume.pdf
-                        cover_letter_path: "", // Optional, provide path if you have one
-                        full_name: "John Doe", // Placeholder
-                        email: "john.doe@example.com", // Placeholder
-                        phone_number: "123-456-7890", // Placeholder
-                        linkedin_profile: "https://www.linkedin.com/in/johndoe", // Placeholder
-                        github_profile: "https://github.com/johndoe", // Placeholder
-                        portfolio_link: "https://www.johndoe.com", // Placeholder
-                        years_of_experience: "5", // Placeholder
-                        grad_month: "05", // Placeholder
-                        grad_year: "2015", // Placeholder
-                        college_name: "University of Placeholder", // Placeholder
-                        degree: "Bachelor", // Placeholder
-                        major: "Computer Science", // Placeholder
-                        work_authorization: "US Citizen", // Placeholder
-                        sponsorship_required: "No", // Placeholder
-                        disability: "No", // Placeholder
-                        veteran_status: "No" // Placeholder
-                    }),
+            const status: SchedulerStatus = await statusResponse.json();
+            const { vacancies: queued }: { vacancies: QueuedVacancy[] } = await queueResponse.json();
+
+            setSchedulerStatus(status);
+            const queuedByUrl = new Map(queued.map(q => [q.url, q]));
+            const restore = !queueRestoredRef.current;
+            queueRestoredRef.current = true;
+            setVacancies(current => {
+                // al abrir la página se muestra lo que ya estaba en la cola
+                if (restore && current.length === 0) {
+                    return queued.map((q, index) => ({
+                        id: index + 1,
+                        title: q.title || 'Vacante Encontrada',
+                        company: q.company || 'Desconocida',
+                        location: q.location || '',
+                        url: q.url,
+                        status: q.status,
+                    }));
+                }
+                return current.map(v => {
+                    const q = queuedByUrl.get(v.url);
+                    return q && q.status !== v.status ? { ...v, status: q.status } : v;
                 });
+            });
 
-                if (!response.ok) {
-                    const errorData = await response.json();
-                    throw new Error(errorData.error || 'Error al aplicar a la vacante.');
+            const batch = status.last_batch;
+            if (batch?.finished_at && batch.finished_at !== lastBatchRef.current) {
+                if (lastBatchRef.current !== null) {
+                    setLogs(prev => [...prev, `Lote finalizado: ${batch.applied} aplicadas, ${batch.failed} fallidas, ${batch.skipped} omitidas.`]);
                 }
-
-                const data = await response.json();
-                success = data.message === "Application successful"; // Assuming backend returns this message on success
-
-            } catch (err: any) {
-                console.error('Error during application:', err);
-                setLogs(prev => [...prev, `Error al aplicar a ${vacancy.title}: ${err.message || 'Desconocido'}`]);
-                success = false;
+                lastBatchRef.current = batch.finished_at;
             }
-
-            const finalStatus: JobStatus = success ? 'applied' : 'failed';
-
-            setVacancies(prev => prev.map(v => v.id === vacancy.id ? { ...v, status: finalStatus } : v));
-            setLogs(prev => [...prev, `-> Estado: ${success ? 'APLICACIÓN EXITOSA' : 'FALLÓ LA APLICACIÓN'}`]);
+        } catch (err) {
+            console.error('Error al consultar el programador:', err);
         }
-
-        setIsApplying(false);
-        setLogs(prev => [...prev, `Lote finalizado. Esperando para la próxima ejecución.`]);
-        setNextRunTime(Date.now() + intervalHours * 60 * 60 * 1000);
-
-    }, [jobsPerBatch, intervalHours, handleStopScheduler]);
+    }, []);
 
     useEffect(() => {
-        runBatchCallbackRef.current = runApplicationBatch;
-    }, [runApplicationBatch]);
+        refreshScheduler();
+        const pollInterval = setInterval(refreshScheduler, STATUS_POLL_MS);
+        return () => clearInterval(pollInterval);
+    }, [refreshScheduler]);
 
-    const handleStartScheduler = () => {
-        if (vacancies.filter(v => v.status === 'pending').length === 0) {
+    const handleStopScheduler = async () => {
+        try {
+            const response = await fetch('http://localhost:5000/api/scheduler/stop', { method: 'POST' });
+            setSchedulerStatus(await response.json());
+            setLogs(prev => [...prev, '--- Programador detenido (las aplicaciones en curso terminarán) ---']);
+        } catch (err: any) {
+            setError(err.message || 'No se pudo detener el programador.');
+        }
+    };
+
+    const handleStartScheduler = async () => {
+        if (pendingCount === 0) {
             setError("No hay vacantes pendientes para aplicar.");
             return;
         }
-        setIsSchedulerRunning(true);
         setError(null);
-        setLogs(prev => [...prev, `Programador iniciado. Aplicando a ${jobsPerBatch} vacantes cada ${intervalHours} hora(s).`]);
 
-        runBatchCallbackRef.current?.();
+        try {
+            const response = await fetch('http://localhost:5000/api/scheduler/start', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    profile: PROFILE,
+                    batch_size: jobsPerBatch,
+                    interval_minutes: intervalHours * 60,
+                    max_parallel: maxParallel,
+                    quiet_hours: quietStart && quietEnd ? { start: quietStart, end: quietEnd } : null,
+                    run_now: true,
+                }),
+            });
 
-        const intervalInMs = intervalHours * 60 * 60 * 1000;
-        schedulerTimerRef.current = setInterval(() => {
-            runBatchCallbackRef.current?.();
-        }, intervalInMs);
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || 'No se pudo iniciar el programador.');
+            }
+            setSchedulerStatus(data);
+            setLogs(prev => [...prev, `Programador iniciado en el servidor. Aplicando a ${jobsPerBatch} vacantes cada ${intervalHours} hora(s), ${maxParallel} a la vez.`]);
+        } catch (err: any) {
+            setError(err.message || 'No se pudo iniciar el programador.');
+        }
     };
 
     useEffect(() => {
@@ -231,6 +268,24 @@ const App: React.FC = () => {
             setVacancies(newVacancies);
             setLogs(prev => [...prev, `Scraping completado. ${newVacancies.length} vacantes encontradas.`]);
 
+            // Encolarlas en el servidor para que el programador las tome aunque se cierre la pestaña
+            if (newVacancies.length > 0) {
+                const queueResponse = await fetch('http://localhost:5000/api/scheduler/queue', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({
+                        vacancies: newVacancies.map(({ url, title, company, location }) => ({ url, title, company, location })),
+                    }),
+                });
+                if (queueResponse.ok) {
+                    const queued = await queueResponse.json();
+                    setLogs(prev => [...prev, `${queued.added} vacantes nuevas en la cola (${queued.queue.pending} pendientes en total).`]);
+                }
+                refreshScheduler();
+            }
+
         } catch (err: any) {
             console.error('Error during scraping:', err);
             setError(err.message || 'Error desconocido durante el scraping.');
@@ -246,6 +301,7 @@ const App: React.FC = () => {
             applying: { text: 'Aplicando...', className: 'status-applying' },
             applied: { text: 'Aplicado', className: 'status-applied' },
             failed: { text: 'Falló', className: 'status-failed' },
+            skipped: { text: 'Omitida', className: 'status-skipped' },
         };
         const { text, className } = statusMap[status];
         return <span className={`status-pill ${className}`}>{text}</span>;
@@ -312,15 +368,27 @@ const App: React.FC = () => {
                                 <label htmlFor="intervalHours">Intervalo (horas)</label>
                                 <input id="intervalHours" type="number" value={intervalHours} onChange={e => setIntervalHours(Number(e.target.value))} min="1" disabled={isSchedulerRunning} />
                             </div>
+                            <div className="input-group vertical">
+                                <label htmlFor="maxParallel">Aplicaciones en Paralelo</label>
+                                <input id="maxParallel" type="number" value={maxParallel} onChange={e => setMaxParallel(Number(e.target.value))} min="1" disabled={isSchedulerRunning} />
+                            </div>
+                            <div className="input-group vertical">
+                                <label htmlFor="quietStart">Silencio desde / hasta</label>
+                                <input id="quietStart" type="time" value={quietStart} onChange={e => setQuietStart(e.target.value)} disabled={isSchedulerRunning} />
+                                <input id="quietEnd" type="time" value={quietEnd} onChange={e => setQuietEnd(e.target.value)} disabled={isSchedulerRunning} />
+                            </div>
                         </div>
                         <div className="scheduler-status">
-                            <p>Estado: <strong>{isSchedulerRunning ? (isApplying ? 'Aplicando...' : 'Activo') : 'Detenido'}</strong></p>
+                            <p>Estado: <strong>{SCHEDULER_STATES[schedulerStatus?.state ?? 'stopped']}</strong></p>
                             {isSchedulerRunning && !isApplying && nextRunTime && (
                                 <p className="countdown-label">Próxima ejecución en: <span className="countdown">{countdown}</span></p>
                             )}
+                            {schedulerStatus && (
+                                <p>Cola: {schedulerStatus.queue.pending} pendientes · {schedulerStatus.queue.applied} aplicadas · {schedulerStatus.queue.failed} fallidas</p>
+                            )}
                         </div>
                         <div className="scheduler-buttons">
-                            <button onClick={handleStartScheduler} disabled={isSchedulerRunning || isScraping || vacancies.length === 0}><Play size={16} /> Iniciar</button>
+                            <button onClick={handleStartScheduler} disabled={isSchedulerRunning || isScraping || pendingCount === 0}><Play size={16} /> Iniciar</button>
                             <button onClick={handleStopScheduler} disabled={!isSchedulerRunning} className="stop-button"><Square size={16} /> Detener</button>
                         </div>
                     </div>
@@ -0,0 +1,281 @@
+# one place every outbound request goes through (urlopen, requests and driver.get):
+# a token bucket per host paces requests, its rate grows while the site keeps answering (up
+# to a ceiling per site) and a 429 / 403 halves it (honouring Retry-After), so each host
+# settles just under whatever it tolerates (additive increase, multiplicative decrease);
+# transient failures are retried with jittered exponential backoff, and a circuit breaker
+# per ATS stops hammering a site that keeps failing until it had time to recover
+import random
+import socket
+import threading
+import time
+import urllib.error
+from urllib.parse import urlparse
+
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# starting requests per second, burst and the most requests per second we ever try, per host
+# (matched on the domain and its subdomains)
+HOST_RATES = {
+    'glassdoor.com': (4.0, 8, 20.0),
+    'greenhouse.io': (5.0, 10, 25.0),
+    'lever.co': (5.0, 10, 25.0),
+}
+DEFAULT_RATE = (10.0, 10, 50.0)
+MIN_RATE = 0.1 # never slow a host down further than this
+INCREASE = 0.05 # share of the starting rate added per successful request
+SLOWDOWN_WINDOW = 1.0 # seconds, the 429s of one burst of parallel requests only halve the rate once
+
+RETRIES = 3 # extra attempts after the first one, for transient failures only
+BACKOFF_BASE = 0.5 # seconds, doubled every attempt
+BACKOFF_CAP = 30.0
+MAX_RETRY_AFTER = 120.0 # ignore Retry-After values longer than this
+
+BREAKER_FAILURES = 5 # consecutive failures before a circuit opens
+BREAKER_COOLDOWN = 60.0 # seconds an open circuit waits before letting one request try
+
+THROTTLED = (429, 403) # statuses that mean "slow down"
+TRANSIENT = THROTTLED + (408, 500, 502, 503, 504)
+
+# every ATS shares one circuit whichever of its hosts we talk to (api, boards, jobs, ...)
+CIRCUITS = ('greenhouse', 'lever', 'glassdoor')
+
+class CircuitOpenError(Exception):
+    pass
+
+# a site that can't be reached right now (circuit open, or still failing after every retry),
+# which says nothing about the job we wanted from it
+class SiteUnavailable(Exception):
+    pass
+
+def _matches(host, domain):
+    return host == domain or host.endswith('.' + domain)
+
+def circuit_key(host):
+    return next((name for name in CIRCUITS if name in host), host)
+
+def status_of(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code
+    return None
+
+def retry_after(error):
+    headers = getattr(error, 'headers', None)
+    if headers is None and isinstance(error, requests.HTTPError) and error.response is not None:
+        headers = error.response.headers
+    try:
+        seconds = float((headers or {}).get('Retry-After'))
+    except (TypeError, ValueError):
+        return None # missing, or an http date, which nobody we talk to sends
+    return min(seconds, MAX_RETRY_AFTER)
+
+# worth another try: throttling, server errors, timeouts and dropped connections
+def is_transient(error):
+    status = status_of(error)
+    if status is not None:
+        return status in TRANSIENT
+    if isinstance(error, (urllib.error.URLError, socket.timeout, ConnectionError, requests.ConnectionError, requests.Timeout, TimeoutException)):
+        return True
+    # chrome reports network trouble as net::ERR_..., anything else (a dead session) isn't ours to retry
+    return isinstance(error, WebDriverException) and 'net::ERR_' in (error.msg or '')
+
+class TokenBucket:
+    def __init__(self, rate, burst, max_rate=None):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max(max_rate or rate, rate)
+        self._lock = threading.Lock()
+        self._tat = 0.0 # when the bucket would be full again (GCRA's theoretical arrival time)
+        self._blocked_until = 0.0
+        self._slowed_at = float('-inf')
+
+    # take a token, returns how long to wait before using it
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            allowed_at = max(tat - (self.burst - 1) * interval, self._blocked_until)
+            self._tat = max(tat, allowed_at) + interval
+            return max(0.0, allowed_at - now)
+
+    def slow_down(self, pause=None):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._slowed_at >= SLOWDOWN_WINDOW:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self._slowed_at = now
+            if pause:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    # additive increase: probe for more throughput, up to the host's ceiling
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.base_rate * INCREASE)
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._count = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    # False while open; after the cooldown a single request is let through to test the site
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._count = 0
+
+    # a probe that only got told to slow down doesn't show the site is back (nor that it's
+    # down), try again after another cooldown; returns True when it reopened the circuit
+    def throttled(self):
+        with self._lock:
+            if self.state != self.HALF_OPEN:
+                return False
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            return True
+
+    # returns True when this failure opened the circuit
+    def failure(self):
+        with self._lock:
+            self._count += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._count >= self.failures):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+class Throttle:
+    def __init__(self, host_rates=HOST_RATES, default_rate=DEFAULT_RATE, retries=RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_cap=BACKOFF_CAP, breaker_failures=BREAKER_FAILURES, breaker_cooldown=BREAKER_COOLDOWN):
+        self.host_rates = host_rates
+        self.default_rate = default_rate
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._breakers = {}
+        self._counters = {} # (host, event) -> count, see _count
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                limits = next((limits for domain, limits in self.host_rates.items() if _matches(host, domain)), self.default_rate)
+                self._buckets[host] = TokenBucket(*limits)
+            return self._buckets[host]
+
+    def breaker(self, key):
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(self.breaker_failures, self.breaker_cooldown)
+            return self._breakers[key]
+
+    # events: requests, ok, retries, throttled, errors, failed, rejected, circuit_opened, wait_seconds
+    def _count(self, host, event, amount=1):
+        with self._lock:
+            self._counters[(host, event)] = self._counters.get((host, event), 0) + amount
+
+    # full jitter: anywhere between 0 and the exponential cap, so retries don't line up
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    # run fn() (which fetches url) under the host's rate limit, retrying transient failures
+    # raises CircuitOpenError without calling fn while the site's circuit is open
+    def call(self, url, fn):
+        host = urlparse(url).hostname
+        if not host:
+            return fn() # about:blank, data: urls and the like
+        bucket = self.bucket(host)
+        key = circuit_key(host)
+        breaker = self.breaker(key)
+
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                self._count(host, 'rejected')
+                raise CircuitOpenError(f'too many failures from {key}, not calling it for now')
+            wait = bucket.reserve()
+            if wait:
+                self._count(host, 'wait_seconds', wait)
+                time.sleep(wait)
+
+            self._count(host, 'requests')
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.success() # the site answered, it just didn't like this request (404, ...)
+                    raise
+                pause = retry_after(e)
+                self._count(host, 'errors')
+                if status_of(e) in THROTTLED:
+                    # the site is up, just asking us to slow down, that's the bucket's job
+                    self._count(host, 'throttled')
+                    bucket.slow_down(pause)
+                    if breaker.throttled():
+                        self._count(host, 'circuit_opened')
+                elif breaker.failure():
+                    self._count(host, 'circuit_opened')
+                if attempt == self.retries:
+                    self._count(host, 'failed')
+                    raise
+                self._count(host, 'retries')
+                time.sleep(max(self.backoff(attempt), pause or 0))
+                continue
+
+            bucket.speed_up()
+            breaker.success()
+            self._count(host, 'ok')
+            return result
+
+    # {host: {event: count, 'rate': current requests/s}} plus {'circuits': {key: state}}
+    def summary(self):
+        with self._lock:
+            hosts = {}
+            for (host, event), value in self._counters.items():
+                hosts.setdefault(host, {})[event] = round(value, 3)
+            for host, bucket in self._buckets.items():
+                hosts.setdefault(host, {})['rate'] = round(bucket.rate, 3)
+            circuits = {key: breaker.state for key, breaker in self._breakers.items()}
+        return {'hosts': hosts, 'circuits': circuits}
+
+    # the same numbers in prometheus text format, for /api/metrics
+    def metrics(self):
+        summary = self.summary()
+        lines = [
+            '# HELP throttle_events_total Outbound requests by host and what happened to them.',
+            '# TYPE throttle_events_total counter',
+        ]
+        for host, events in sorted(summary['hosts'].items()):
+            for event, value in sorted(events.items()):
+                if event not in ('rate', 'wait_seconds'):
+                    lines.append(f'throttle_events_total{{host="{host}",event="{event}"}} {value}')
+        lines += ['# HELP throttle_wait_seconds_total Time spent waiting for a host\'s rate limit.', '# TYPE throttle_wait_seconds_total counter']
+        lines += [f'throttle_wait_seconds_total{{host="{host}"}} {events.get("wait_seconds", 0)}' for host, events in sorted(summary['hosts'].items())]
+        lines += ['# HELP throttle_rate Current allowed requests per second per host.', '# TYPE throttle_rate gauge']
+        lines += [f'throttle_rate{{host="{host}"}} {events["rate"]}' for host, events in sorted(summary['hosts'].items()) if 'rate' in events]
+        lines += ['# HELP throttle_circuit_open Whether a site\'s circuit breaker is open (1) or not (0).', '# TYPE throttle_circuit_open gauge']
+        lines += [f'throttle_circuit_open{{circuit="{key}"}} {int(state != CircuitBreaker.CLOSED)}' for key, state in sorted(summary['circuits'].items())]
+        return '\n'.join(lines) + '\n'
+
+# shared by every thread in the process, so all callers see the same limits
+throttle = Throttle()
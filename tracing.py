@@ -0,0 +1,185 @@
+# spans around each stage of scraping / applying, so a slow batch shows where the time went
+# (chrome startup, page loads, waits, form filling, resume upload, submit, ...)
+# finished spans are aggregated into per-stage histograms served in prometheus text format,
+# and the most recent ones are kept (and optionally appended to a file) as JSON lines
+# set TRACING=0 to turn it off, spans then cost one attribute check and nothing else
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from functools import wraps
+
+ENABLED = os.environ.get('TRACING', '1') != '0'
+TRACE_FILE = os.environ.get('TRACE_FILE') # every finished span is appended here when set
+KEEP = 1000 # finished spans kept in memory for dump()
+
+# histogram buckets in seconds, from a quick wait up to a whole application
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# tags that become prometheus labels, the rest only go to the trace dump
+# (anything with unbounded values, like urls, would blow up the number of series)
+LABELS = ('ats', 'outcome', 'step')
+
+class Span:
+    __slots__ = ('tracer', 'name', 'tags', 'trace_id', 'span_id', 'parent_id', 'start', '_parent', '_t0')
+
+    def __init__(self, tracer, name, tags):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def __enter__(self):
+        self._parent = self.tracer.current()
+        self.trace_id = self._parent.trace_id if self._parent else uuid.uuid4().hex[:16]
+        self.parent_id = self._parent.span_id if self._parent else None
+        self.span_id = uuid.uuid4().hex[:8]
+        self.tracer._local.span = self
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        self.tracer._local.span = self._parent
+        # an outcome tagged by the code itself wins, e.g. outcome=timeout
+        if exc_type is not None:
+            self.tags.setdefault('outcome', 'error')
+            self.tags.setdefault('error', f'{exc_type.__name__}: {exc}')
+        else:
+            self.tags.setdefault('outcome', 'ok')
+        self.tracer._finish(self, seconds)
+        return False
+
+# what span() hands out while tracing is off
+class _NoopSpan:
+    __slots__ = ()
+
+    def tag(self, **tags):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP = _NoopSpan()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(pairs):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+class Tracer:
+    def __init__(self, enabled=ENABLED, trace_file=TRACE_FILE, keep=KEEP, buckets=BUCKETS):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.buckets = buckets
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=keep)
+        self._histograms = {} # (name, labels) -> [bucket counts..., sum, count]
+        self._counts = {} # (name, tag) -> sum of a numeric tag, e.g. links found
+
+    def current(self):
+        return getattr(self._local, 'span', None)
+
+    # usage:
+    #     with span('page.load', ats='lever') as s:
+    #         driver.get(link)
+    #         s.tag(fields=12)
+    # nested spans share the trace id of the outermost one (per thread)
+    def span(self, name, **tags):
+        if not self.enabled:
+            return NOOP
+        return Span(self, name, tags)
+
+    # decorator version, functions that report failure by returning False (like the
+    # ATS handlers) get outcome=failed
+    def traced(self, name, **tags):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with Span(self, name, dict(tags)) as s:
+                    result = fn(*args, **kwargs)
+                    if result is False:
+                        s.tag(outcome='failed')
+                    return result
+            return wrapper
+        return decorator
+
+    def _finish(self, span, seconds):
+        labels = tuple((key, span.tags[key]) for key in LABELS if key in span.tags)
+        record = {
+            'trace_id': span.trace_id, 'span_id': span.span_id, 'parent_id': span.parent_id,
+            'name': span.name, 'start': round(span.start, 6), 'seconds': round(seconds, 6), 'tags': span.tags,
+        }
+        with self._lock:
+            histogram = self._histograms.get((span.name, labels))
+            if histogram is None:
+                histogram = self._histograms[(span.name, labels)] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            for key, value in span.tags.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._counts[(span.name, key)] = self._counts.get((span.name, key), 0) + value
+            self._recent.append(record)
+            if self.trace_file:
+                with open(self.trace_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+    # everything aggregated so far in prometheus text exposition format
+    def metrics(self):
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: (item[0][0], item[0][1]))
+            counts = sorted(self._counts.items())
+
+        lines = [
+            '# HELP span_duration_seconds Time spent in each traced stage.',
+            '# TYPE span_duration_seconds histogram',
+        ]
+        for (name, labels), histogram in histograms:
+            pairs = (('span', name),) + labels
+            for bound, count in zip(self.buckets, histogram):
+                lines.append(f'span_duration_seconds_bucket{_labels(pairs + (("le", bound),))} {count}')
+            lines.append(f'span_duration_seconds_bucket{_labels(pairs + (("le", "+Inf"),))} {histogram[-1]}')
+            lines.append(f'span_duration_seconds_sum{_labels(pairs)} {histogram[-2]:.6f}')
+            lines.append(f'span_duration_seconds_count{_labels(pairs)} {histogram[-1]}')
+
+        lines += [
+            '# HELP span_tag_total Sum of the numeric tags of each traced stage (links found, fields filled, ...).',
+            '# TYPE span_tag_total counter',
+        ]
+        for (name, tag), total in counts:
+            lines.append(f'span_tag_total{_labels((("span", name), ("tag", tag)))} {total}')
+        return '\n'.join(lines) + '\n'
+
+    # the most recent finished spans, oldest first
+    def spans(self):
+        with self._lock:
+            return list(self._recent)
+
+    # the recent spans as JSON lines
+    def dump(self):
+        return ''.join(json.dumps(record, default=str) + '\n' for record in self.spans())
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._histograms.clear()
+            self._counts.clear()
+
+# shared by every thread in the process, like the wait profiler
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
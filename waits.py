@@ -0,0 +1,79 @@
+# explicit waits for the Selenium steps, plus a profiler of how long each one took
+# instead of sleeping a fixed number of seconds, every step waits for the element it
+# actually needs and moves on as soon as it's there
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from tracing import span
+
+# max seconds to wait per step, change these (or pass timeout=) if a site is slow
+TIMEOUTS = {
+    'search_bar': 20, # glassdoor search bar after login
+    'search_location': 3, # glassdoor location suggestions under the search bar
+    'search_button': 5, # glassdoor search button taking clicks
+    'results': 20, # glassdoor results list
+    'job_links': 10, # job cards inside the results list
+    'application_form': 15, # greenhouse / lever form after driver.get
+    'location_autocomplete': 5, # greenhouse location suggestions
+}
+DEFAULT_TIMEOUT = 10
+POLL_FREQUENCY = 0.1
+
+class WaitProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = {}
+
+    def record(self, step, seconds, timed_out):
+        with self._lock:
+            stats = self._steps.setdefault(step, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['timeouts'] += int(timed_out)
+
+    # per step: how many waits, total / mean / max seconds and how many ran out of time
+    def summary(self):
+        with self._lock:
+            return {
+                step: {
+                    'count': stats['count'],
+                    'total': round(stats['total'], 3),
+                    'mean': round(stats['total'] / stats['count'], 3),
+                    'max': round(stats['max'], 3),
+                    'timeouts': stats['timeouts'],
+                }
+                for step, stats in self._steps.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._steps.clear()
+
+# shared by every driver in the process so a whole batch shows up in one place
+profiler = WaitProfiler()
+
+# wait until condition(driver) is truthy and return its value, raises TimeoutException
+def wait_for(driver, step, condition, timeout=None):
+    if timeout is None:
+        timeout = TIMEOUTS.get(step, DEFAULT_TIMEOUT)
+    start = time.perf_counter()
+    with span('wait', step=step) as s:
+        try:
+            result = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+        except TimeoutException:
+            profiler.record(step, time.perf_counter() - start, True)
+            s.tag(outcome='timeout')
+            raise
+    profiler.record(step, time.perf_counter() - start, False)
+    return result
+
+# same as wait_for, but for things that may legitimately never show up: returns None instead
+def wait_optional(driver, step, condition, timeout=None):
+    try:
+        return wait_for(driver, step, condition, timeout)
+    except TimeoutException:
+        return None